@@ -37,6 +37,18 @@ extension_codes_collection = database["extension_codes"]
 # ✅ ADD THIS (for dashboard graph history)
 skill_history_collection = database["skill_history"]
 
+# LLM code-analysis results (expire via TTL index)
+analysis_cache_collection = database["analysis_cache"]
+
+# last analyzed version of each (user, file) for incremental analysis
+analyzed_files_collection = database["analyzed_files"]
+
+# running per-user, per-skill event counters for the skill report
+user_skill_aggregates_collection = database["user_skill_aggregates"]
+
+# queued / running / finished code-analysis jobs
+analysis_jobs_collection = database["analysis_jobs"]
+
 
 # -------------------- Init --------------------
 async def init_db():
@@ -50,9 +62,38 @@ async def init_db():
 
     await events_collection.create_index("user_id")
 
-    # ✅ Recommended index for graph performance
-    await skill_history_collection.create_index("user_id")
+    await user_skill_aggregates_collection.create_index(
+        [("user_id", 1), ("skill", 1)], unique=True
+    )
+
+    # ✅ Recommended index for graph performance (range scans per user)
+    await skill_history_collection.create_index([("user_id", 1), ("date", 1)])
+
+    # content-hash dedup for bulk ingestion (older chunks have no hash)
+    await knowledge_collection.create_index(
+        "content_hash",
+        unique=True,
+        partialFilterExpression={"content_hash": {"$exists": True}}
+    )
+
+    # expires_at holds the absolute expiry, so the TTL can change per entry
+    await analysis_cache_collection.create_index("expires_at", expireAfterSeconds=0)
+
+    await analyzed_files_collection.create_index(
+        [("user_id", 1), ("file_path", 1)], unique=True
+    )
+
+    # a retried submit with the same key returns the original job
+    await analysis_jobs_collection.create_index(
+        [("user_id", 1), ("idempotency_key", 1)],
+        unique=True,
+        partialFilterExpression={"idempotency_key": {"$type": "string"}}
+    )
+
+    # workers claim the oldest queued (or lease-expired) job
+    await analysis_jobs_collection.create_index([("status", 1), ("created_at", 1)])
 
-    await knowledge_collection.create_index("embedding")
+    # finished jobs are dropped after their retention period
+    await analysis_jobs_collection.create_index("expires_at", expireAfterSeconds=0)
 
     print("✅ MongoDB ready")
\ No newline at end of file
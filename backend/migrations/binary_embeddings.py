@@ -0,0 +1,84 @@
+"""
+Rewrite skill_knowledge embeddings stored as BSON double arrays into the
+compact binary format (float16, or int8 + per-vector scale).
+
+    python -m backend.migrations.binary_embeddings [--format int8] [--dry-run]
+
+Safe to re-run: only documents still holding an array are touched.
+"""
+import argparse
+import asyncio
+
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from backend.database import knowledge_collection
+from backend.services.embedding_codec import (
+    EMBEDDING_FORMAT,
+    FORMATS,
+    encode_embedding
+)
+
+BATCH_SIZE = 500
+
+
+async def migrate(fmt: str = EMBEDDING_FORMAT, dry_run: bool = False) -> int:
+    if fmt == "list":
+        raise SystemExit("❌ Target format must be binary (float16 or int8)")
+
+    cursor = knowledge_collection.find(
+        {"embedding": {"$type": "array"}},
+        {"embedding": 1}
+    ).batch_size(BATCH_SIZE)
+
+    ops = []
+    migrated = 0
+
+    async for doc in cursor:
+        fields = encode_embedding(doc["embedding"], fmt)
+        ops.append(UpdateOne(
+            {"_id": doc["_id"], "embedding": {"$type": "array"}},
+            {"$set": fields}
+        ))
+
+        if len(ops) >= BATCH_SIZE:
+            migrated += await _flush(ops, dry_run)
+            ops = []
+
+    migrated += await _flush(ops, dry_run)
+
+    if not dry_run:
+        # the old multikey index over 384 doubles per chunk is useless for
+        # search and cannot hold binary vectors efficiently
+        try:
+            await knowledge_collection.drop_index("embedding_1")
+        except OperationFailure:
+            pass
+
+    return migrated
+
+
+async def _flush(ops, dry_run: bool) -> int:
+    if not ops:
+        return 0
+    if dry_run:
+        return len(ops)
+
+    result = await knowledge_collection.bulk_write(ops, ordered=False)
+    return result.modified_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--format", choices=[f for f in FORMATS if f != "list"],
+                        default=EMBEDDING_FORMAT if EMBEDDING_FORMAT != "list" else "float16")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    migrated = asyncio.run(migrate(args.format, args.dry_run))
+    verb = "would migrate" if args.dry_run else "migrated"
+    print(f"✅ {verb} {migrated} chunks to {args.format}")
+
+
+if __name__ == "__main__":
+    main()
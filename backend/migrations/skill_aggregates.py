@@ -0,0 +1,75 @@
+"""
+Rebuild user_skill_aggregates (per-user, per-skill event counters) from
+the full events collection.
+
+    python -m backend.migrations.skill_aggregates [--dry-run]
+
+Safe to re-run: each (user, skill) document is replaced with counts
+recomputed from scratch. Run it once before the first deploy that reads
+the aggregates; events ingested while it runs may be counted twice.
+"""
+import argparse
+import asyncio
+
+from backend.database import events_collection, user_skill_aggregates_collection
+
+# same rules as skill_summary.event_skill / record_event_aggregate
+PIPELINE = [
+    {"$project": {
+        "user_id": 1,
+        "skill": {"$toLower": {"$ifNull": ["$language", "$skill"]}},
+        "gap": 1,
+        "difficulty": {"$ifNull": ["$difficulty", 1]}
+    }},
+    {"$match": {"skill": {"$ne": ""}}},
+    {"$group": {
+        "_id": {"user_id": "$user_id", "skill": "$skill"},
+        "total": {"$sum": 1},
+        "successes": {"$sum": {"$cond": [{"$ifNull": ["$gap", False]}, 0, 1]}},
+        "difficulty_sum": {"$sum": "$difficulty"}
+    }},
+    {"$project": {
+        "_id": 0,
+        "user_id": "$_id.user_id",
+        "skill": "$_id.skill",
+        "total": 1,
+        "successes": 1,
+        "difficulty_sum": 1,
+        "updated_at": "$$NOW"
+    }}
+]
+
+
+async def migrate(dry_run: bool = False) -> int:
+    if dry_run:
+        count = [{"$count": "aggregates"}]
+        rows = await events_collection.aggregate(PIPELINE + count).to_list(1)
+        return rows[0]["aggregates"] if rows else 0
+
+    # $merge matches on (user_id, skill), which needs the unique index
+    await user_skill_aggregates_collection.create_index(
+        [("user_id", 1), ("skill", 1)], unique=True
+    )
+
+    await events_collection.aggregate(PIPELINE + [{"$merge": {
+        "into": user_skill_aggregates_collection.name,
+        "on": ["user_id", "skill"],
+        "whenMatched": "replace",
+        "whenNotMatched": "insert"
+    }}], allowDiskUse=True).to_list(None)
+
+    return await user_skill_aggregates_collection.count_documents({})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    rebuilt = asyncio.run(migrate(args.dry_run))
+    verb = "would rebuild" if args.dry_run else "rebuilt"
+    print(f"✅ {verb} {rebuilt} skill aggregates")
+
+
+if __name__ == "__main__":
+    main()
@@ -107,4 +107,48 @@ class UserSkillState(BaseModel):
     current_level: int = Field(..., ge=1, le=5)
     target_level: int = Field(5, ge=1, le=5)
     confidence_score: float = Field(0.0, ge=0.0, le=1.0)
-    last_evaluated: datetime
\ No newline at end of file
+    last_evaluated: datetime
+
+
+# -------------------------------------------------
+# 🤖 LLM Code Analysis Result
+# -------------------------------------------------
+class CodeAnalysis(BaseModel):
+    has_error: bool = False
+    confidence_score: int = Field(50, ge=0, le=100)
+    simple_explanation: str = ""
+    corrected_code: str = ""
+    next_steps: List[str] = []
+
+    # LLM output is loosely typed: "true", "85", 85.5, or junk
+    @field_validator("has_error", mode="before")
+    @classmethod
+    def coerce_flag(cls, v):
+        if isinstance(v, str):
+            return v.strip().lower() in ("true", "yes", "1")
+        return bool(v)
+
+    @field_validator("confidence_score", mode="before")
+    @classmethod
+    def coerce_score(cls, v):
+        try:
+            return min(100, max(0, int(float(v))))
+        except (TypeError, ValueError):
+            return 50
+
+    @field_validator("simple_explanation", "corrected_code", mode="before")
+    @classmethod
+    def coerce_text(cls, v):
+        return "" if v is None else str(v)
+
+    # ✅ at most 3 next steps
+    @field_validator("next_steps", mode="before")
+    @classmethod
+    def limit_steps(cls, v):
+        if not isinstance(v, list):
+            return []
+        return [str(step) for step in v[:3]]
+
+    @classmethod
+    def fallback(cls, message: str) -> "CodeAnalysis":
+        return cls(simple_explanation=message)
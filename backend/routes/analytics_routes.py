@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
 from bson import ObjectId
-from collections import defaultdict
-from datetime import datetime
+from datetime import date
 
 from backend.auth import get_current_user, require_admin
 from backend.services.skill_summary import generate_skill_report
-from backend.database import users_collection, skill_history_collection
+from backend.services.skill_history_service import skill_history_series, history_range
+from backend.database import users_collection
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
+Granularity = Literal["day", "week", "month"]
+
 
 # -------------------------------------------------
 # 👤 USER: CURRENT SKILL REPORT
@@ -61,49 +64,27 @@ async def get_user_skill_report(
 
 
 # -------------------------------------------------
-# 📈 USER: SKILL HISTORY (DAILY CLEAN TREND)
+# 📈 USER: SKILL HISTORY (CLEAN TREND)
 # -------------------------------------------------
 @router.get("/skills/history")
-async def get_skill_history(user=Depends(get_current_user)):
-
-    history = await skill_history_collection.find(
-        {"user_id": user["sub"]}
-    ).to_list(1000)
-
-    if not history:
-        return []
-
-    grouped = defaultdict(list)
-
-    for h in history:
-        if h.get("created_at"):
-            date_key = h["created_at"].date()
-            grouped[date_key].append(
-                float(h.get("confidence_score", 0))
-            )
-
-    clean_history = []
-
-    for date, scores in sorted(grouped.items()):
-        average_score = sum(scores) / len(scores)
-
-        clean_history.append({
-            "created_at": datetime.combine(
-                date,
-                datetime.min.time()
-            ),
-            "confidence_score": round(average_score, 2)
-        })
-
-    return clean_history
+async def get_skill_history(
+    start: date | None = Query(None, alias="from"),
+    end: date | None = Query(None, alias="to"),
+    granularity: Granularity = "day",
+    user=Depends(get_current_user)
+):
+    return await _history(user["sub"], start, end, granularity)
 
 
 # -------------------------------------------------
-# 👑 ADMIN: USER HISTORY (DAILY CLEAN)
+# 👑 ADMIN: USER HISTORY (CLEAN TREND)
 # -------------------------------------------------
 @router.get("/admin/{user_id}/history")
 async def get_user_history(
     user_id: str,
+    start: date | None = Query(None, alias="from"),
+    end: date | None = Query(None, alias="to"),
+    granularity: Granularity = "day",
     admin=Depends(require_admin)
 ):
 
@@ -112,33 +93,14 @@ async def get_user_history(
     except:
         raise HTTPException(status_code=400, detail="Invalid user ID")
 
-    history = await skill_history_collection.find(
-        {"user_id": user_id}
-    ).to_list(1000)
-
-    if not history:
-        return []
+    return await _history(user_id, start, end, granularity)
 
-    grouped = defaultdict(list)
 
-    for h in history:
-        if h.get("created_at"):
-            date_key = h["created_at"].date()
-            grouped[date_key].append(
-                float(h.get("confidence_score", 0))
-            )
-
-    clean_history = []
-
-    for date, scores in sorted(grouped.items()):
-        average_score = sum(scores) / len(scores)
-
-        clean_history.append({
-            "created_at": datetime.combine(
-                date,
-                datetime.min.time()
-            ),
-            "confidence_score": round(average_score, 2)
-        })
+async def _history(user_id: str, start, end, granularity: str):
+    """
+    One point per day / week / month; from and to are inclusive dates
+    """
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
 
-    return clean_history
\ No newline at end of file
+    return await skill_history_series(user_id, *history_range(start, end), granularity)
@@ -1,8 +1,10 @@
+import asyncio
 from fastapi import APIRouter, Depends, Body
 from datetime import datetime
 
 from backend.auth import get_current_user
 from backend.services.event_processor import process_event
+from backend.services.skill_summary import record_event_aggregate
 from backend.database import events_collection
 
 router = APIRouter(prefix="/events", tags=["Events"])
@@ -28,7 +30,11 @@ async def ingest_event(
         "created_at": datetime.utcnow()
     }
 
-    await events_collection.insert_one(record)
+    # the raw event plus the counters the skill report reads
+    await asyncio.gather(
+        events_collection.insert_one(record),
+        record_event_aggregate(record)
+    )
 
     return {
         "status": "stored",
@@ -1,9 +1,19 @@
-from fastapi import APIRouter
+from typing import List
+from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
 from pydantic import BaseModel
-from backend.services.knowledge_ingest import ingest_knowledge
+from backend.services.knowledge_ingest import (
+    document_chunks,
+    ingest_chunk_stream,
+    ingest_knowledge,
+    iter_decoded,
+    iter_ndjson,
+    ndjson_chunks
+)
 
 router = APIRouter(prefix="/knowledge", tags=["Knowledge Base"])
 
+UPLOAD_READ_SIZE = 64 * 1024
+
 
 class KnowledgeIngestRequest(BaseModel):
     skill: str
@@ -21,3 +31,61 @@ async def ingest_knowledge_api(data: KnowledgeIngestRequest):
         "message": "Knowledge ingested successfully",
         "details": result
     }
+
+
+# -------------------------------------------------
+# 📦 BULK: NDJSON BODY ({"skill", "content", "source"?} per line)
+# -------------------------------------------------
+@router.post("/ingest/stream")
+async def ingest_knowledge_stream(request: Request):
+    """
+    A malformed line (or one that is not a JSON object) ends the upload
+    with a 400; batches written before that line stay committed, and a
+    retry of the whole body skips them as duplicates.
+    """
+    try:
+        result = await ingest_chunk_stream(
+            ndjson_chunks(iter_ndjson(request.stream()))
+        )
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid NDJSON: {e}")
+
+    return {
+        "message": "Knowledge ingested successfully",
+        "details": result
+    }
+
+
+# -------------------------------------------------
+# 📦 BULK: MULTIPART FILE UPLOAD
+# -------------------------------------------------
+async def _read_upload(upload: UploadFile):
+    while data := await upload.read(UPLOAD_READ_SIZE):
+        yield data
+
+
+async def _upload_chunks(skill: str, files: List[UploadFile]):
+    for upload in files:
+        async for record in document_chunks(
+            skill,
+            iter_decoded(_read_upload(upload)),
+            source=upload.filename or "upload"
+        ):
+            yield record
+
+
+@router.post("/ingest/upload")
+async def ingest_knowledge_upload(
+    skill: str = Form(...),
+    files: List[UploadFile] = File(...)
+):
+    result = await ingest_chunk_stream(_upload_chunks(skill, files))
+
+    return {
+        "message": "Knowledge ingested successfully",
+        "details": {
+            "skill": skill,
+            "files": len(files),
+            **result
+        }
+    }
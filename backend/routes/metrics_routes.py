@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends
+
+from backend.auth import require_admin
+from backend.services.embeddings import embedding_batcher
+from backend.services.embedding_cache import embedding_cache
+from backend.services.analysis_cache import analysis_cache
+from backend.services.llm_engine import PROMPT_VERSION, llm_flight
+from backend.services.llm_scheduler import llm_scheduler
+from backend.services.analysis_jobs import job_workers
+from backend.services.tracing import span_stats, TRACING_ENABLED
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+# -------------------------------------------------
+# 👑 ADMIN: EMBEDDING EXECUTOR + CACHE STATS
+# -------------------------------------------------
+@router.get("/embeddings")
+async def embedding_metrics(admin=Depends(require_admin)):
+    return {
+        **embedding_batcher.stats(),
+        "cache": embedding_cache.stats()
+    }
+
+
+# -------------------------------------------------
+# 👑 ADMIN: CODE ANALYSIS RESULT CACHE
+# -------------------------------------------------
+@router.get("/analysis-cache")
+async def analysis_cache_metrics(admin=Depends(require_admin)):
+    return {
+        **analysis_cache.stats(),
+        "prompt_version": PROMPT_VERSION
+    }
+
+
+# -------------------------------------------------
+# 👑 ADMIN: LLM REQUEST COALESCING
+# -------------------------------------------------
+@router.get("/llm")
+async def llm_metrics(admin=Depends(require_admin)):
+    return {
+        "single_flight": llm_flight.stats(),
+        "scheduler": llm_scheduler.stats()
+    }
+
+
+# -------------------------------------------------
+# 👑 ADMIN: SPAN LATENCY HISTOGRAMS
+# -------------------------------------------------
+@router.get("/spans")
+async def span_metrics(admin=Depends(require_admin)):
+    return {
+        "enabled": TRACING_ENABLED,
+        "spans": span_stats()
+    }
+
+
+# -------------------------------------------------
+# 👑 ADMIN: ANALYSIS JOB QUEUE
+# -------------------------------------------------
+@router.get("/jobs")
+async def job_metrics(admin=Depends(require_admin)):
+    return await job_workers.stats()
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 
 from backend.auth import get_current_user
-from backend.services.rag_engine import rag_answer
+from backend.services.rag_engine import rag_answer, stream_rag_answer
+from backend.services.sse import sse_event, sse_response
 
 router = APIRouter(prefix="/rag", tags=["RAG"])
 
@@ -12,6 +13,8 @@ router = APIRouter(prefix="/rag", tags=["RAG"])
 # -------------------------------------------------
 class RagRequest(BaseModel):
     question: str
+    skills: list[str] | None = None
+    stream: bool = False
 
 
 # -------------------------------------------------
@@ -25,11 +28,19 @@ async def ask_rag(
     """
     RAG-based question answering.
     Used by frontend / browser extension.
+    With stream=true the answer is sent as server-sent events.
     """
 
     enriched_question = f"{data.question}. User role: {user['role']}"
 
-    answer = await rag_answer(enriched_question)
+    if data.stream:
+        async def events():
+            async for piece in stream_rag_answer(enriched_question, skills=data.skills):
+                yield sse_event({"delta": piece})
+
+        return sse_response(events())
+
+    answer = await rag_answer(enriched_question, skills=data.skills)
 
     return {
         "answer": answer
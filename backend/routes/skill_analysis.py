@@ -1,68 +1,192 @@
 # skill_analysis.py
 
-from fastapi import APIRouter, Depends
-from pydantic import BaseModel
-from datetime import datetime
+import os
+import json
+import asyncio
+from fastapi import APIRouter, Depends, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 from backend.auth import get_current_user
-from backend.services.skill_engine import analyze_skill
-from backend.services.skill_summary import generate_skill_report
-from backend.database import skill_history_collection
+from backend.services.analysis_jobs import (
+    submit_job, get_job, wait_for_job, job_view, FINISHED, JOB_POLL_SECONDS
+)
+from backend.services.skill_engine import stream_skill_analysis
+from backend.services.incremental_analysis import analyze_submission
+from backend.services.sse import sse_event, sse_response
+from backend.services.skill_history_service import record_daily_score
+from backend.services.llm_scheduler import INTERACTIVE, BATCH
 
 router = APIRouter(prefix="/analyze", tags=["Analysis"])
 
+ANALYZE_BATCH_CONCURRENCY = int(os.getenv("ANALYZE_BATCH_CONCURRENCY", "8"))
+ANALYZE_BATCH_MAX_FILES = int(os.getenv("ANALYZE_BATCH_MAX_FILES", "500"))
+
 
 class CodeRequest(BaseModel):
     language: str
     code: str
     diagnostics: str | None = None
+    file_path: str | None = None  # enables incremental analysis
+
+
+class JobRequest(CodeRequest):
+    idempotency_key: str | None = Field(None, max_length=200)
+
+
+class BatchRequest(BaseModel):
+    files: list[CodeRequest] = Field(..., max_length=ANALYZE_BATCH_MAX_FILES)
+
+
+async def run_analysis(request: CodeRequest, user_id: str, priority: int = INTERACTIVE) -> dict:
+    return await analyze_submission(user_id, **request.model_dump(), priority=priority)
 
 
 @router.post("/code")
 async def analyze_code(request: CodeRequest, user=Depends(get_current_user)):
 
     # 1️⃣ Run AI analysis
-    result = analyze_skill(
-        language=request.language,
-        code=request.code,
-        combined_context=request.diagnostics or ""
-    )
+    result = await run_analysis(request, user["sub"])
 
-    # 2️⃣ Get updated overall score
-    report = await generate_skill_report(user["sub"])
-    overall_score = float(report.get("overall_score", 50))
-
-    now = datetime.utcnow()
-
-    # 🔧 FIX: use datetime instead of date
-    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-    # 3️⃣ Check if today's record exists
-    existing = await skill_history_collection.find_one({
-        "user_id": user["sub"],
-        "date": today
-    })
-
-    if existing:
-        # Update today's score
-        await skill_history_collection.update_one(
-            {"_id": existing["_id"]},
-            {
-                "$set": {
-                    "confidence_score": overall_score,
-                    "updated_at": now
-                }
-            }
-        )
-    else:
-        # Insert new daily record
-        await skill_history_collection.insert_one({
-            "user_id": user["sub"],
-            "confidence_score": overall_score,
-            "date": today,
-            "created_at": now
-        })
+    # 2️⃣ Update today's dashboard score
+    await record_daily_score(user["sub"])
 
     return {
         "analysis": result
-    }
\ No newline at end of file
+    }
+
+
+@router.post("/code/stream")
+async def analyze_code_stream(request: CodeRequest, user=Depends(get_current_user)):
+    """
+    Same analysis as /code, as server-sent events: "delta" events carry
+    the explanation while it is generated, "result" the full analysis
+    """
+
+    async def events():
+        async for kind, payload in stream_skill_analysis(
+            language=request.language,
+            code=request.code,
+            combined_context=request.diagnostics or ""
+        ):
+            if kind == "result":
+                await record_daily_score(user["sub"])
+                yield sse_event({"analysis": payload}, "result")
+            else:
+                yield sse_event({"delta": payload})
+
+    return sse_response(events())
+
+
+@router.post("/batch")
+async def analyze_batch(request: BatchRequest, user=Depends(get_current_user)):
+    """
+    Workspace scan: files are analyzed concurrently (bounded, at batch
+    priority) and streamed back as NDJSON lines as each one finishes.
+    The daily history is updated once, after the last file.
+    """
+
+    semaphore = asyncio.Semaphore(ANALYZE_BATCH_CONCURRENCY)
+
+    async def analyze_one(index: int, file: CodeRequest) -> dict:
+        async with semaphore:
+            try:
+                analysis = await run_analysis(file, user["sub"], priority=BATCH)
+                return {"index": index, "file_path": file.file_path, "analysis": analysis}
+            except Exception as e:
+                print("⚠️ Batch analysis failed:", e)
+                return {"index": index, "file_path": file.file_path, "error": str(e)}
+
+    async def lines():
+        tasks = [
+            asyncio.create_task(analyze_one(index, file))
+            for index, file in enumerate(request.files)
+        ]
+        failed = 0
+
+        try:
+            for finished in asyncio.as_completed(tasks):
+                item = await finished
+                failed += "error" in item
+                yield json.dumps(item) + "\n"
+        finally:
+            # client went away: stop the remaining analyses
+            for task in tasks:
+                task.cancel()
+
+        await record_daily_score(user["sub"])
+
+        yield json.dumps({"done": True, "files": len(tasks), "failed": failed}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# -------------------------------------------------
+# 📬 BACKGROUND JOBS
+# -------------------------------------------------
+@router.post("/jobs", status_code=202)
+async def submit_analysis_job(
+    request: JobRequest,
+    idempotency_key: str | None = Header(None, max_length=200),
+    user=Depends(get_current_user)
+):
+    """
+    Queue an analysis and return its job id at once. A retry with the
+    same idempotency key (body field or Idempotency-Key header) returns
+    the original job instead of analyzing again.
+    """
+
+    job, created = await submit_job(
+        user["sub"],
+        request.model_dump(exclude={"idempotency_key"}),
+        idempotency_key=request.idempotency_key or idempotency_key
+    )
+
+    return JSONResponse(job_view(job), status_code=202 if created else 200)
+
+
+@router.get("/jobs/{job_id}")
+async def analysis_job_status(job_id: str, user=Depends(get_current_user)):
+    job = await get_job(user["sub"], job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job)
+
+
+@router.websocket("/jobs/{job_id}/ws")
+async def analysis_job_updates(websocket: WebSocket, job_id: str, token: str):
+    """
+    Pushes the job on connect and whenever its status changes, then
+    closes once it has finished (browsers cannot set an Authorization
+    header on WebSockets, so the token comes as a query parameter)
+    """
+
+    try:
+        user = get_current_user(token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    job = await get_job(user["sub"], job_id)
+    if job is None:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+
+    try:
+        status = None
+        while True:
+            if job["status"] != status:
+                status = job["status"]
+                await websocket.send_json(job_view(job))
+            if status in FINISHED:
+                break
+
+            await wait_for_job(job_id, JOB_POLL_SECONDS)
+            job = await get_job(user["sub"], job_id) or job
+
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
@@ -1,9 +1,86 @@
+import asyncio
+from typing import Dict, List
+
 from backend.services.skill_engine import analyze_skill
-from backend.services.retrieval import retrieve_context
+from backend.services.retrieval import retrieve_chunks
 from backend.services.llm_engine import generate_answer
-from backend.services.skill_state_service import upsert_skill_state
+from backend.services.skill_state_service import bulk_upsert_skill_states
 from backend.services.taxonomy_service import normalize
 from backend.services.skill_normalizer import normalize_gap_to_skill
+from backend.services.tracing import span, traced
+
+# strong references, so fire-and-forget tasks are not garbage collected
+_background_tasks = set()
+
+
+def run_in_background(coro, label: str):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+
+    def done(task: asyncio.Task):
+        _background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️ Background {label} failed:", task.exception())
+
+    task.add_done_callback(done)
+    return task
+
+
+def skill_state_updates(
+    language: str,
+    skill_gaps: List[str],
+    estimated_level: int,
+    confidence_score: float
+) -> List[Dict]:
+    """
+    The language itself plus one (weaker) state per recognised gap;
+    one update per skill, the language entry wins
+    """
+    states = {
+        normalize(language): {
+            "estimated_level": estimated_level,
+            "confidence_score": confidence_score
+        }
+    }
+
+    for gap in skill_gaps:
+        normalized = normalize_gap_to_skill(gap)
+        if not normalized:
+            continue
+
+        states.setdefault(normalized, {
+            "estimated_level": max(1, estimated_level - 1),
+            "confidence_score": confidence_score * 0.8
+        })
+
+    return [{"skill": skill, **state} for skill, state in states.items()]
+
+
+@traced("pipeline.guidance")
+async def _guidance(language: str, skill_gaps: List[str]):
+    # 3️⃣ Build RAG query
+    query = (
+        f"Explain and improve: {', '.join(skill_gaps)}"
+        if skill_gaps
+        else f"Improve and optimize this {language} code"
+    )
+
+    # 4️⃣ Retrieve knowledge (language + gap partitions only)
+    gap_skills = [normalize_gap_to_skill(gap) for gap in skill_gaps]
+
+    context_chunks = await retrieve_chunks(
+        query,
+        top_k=5,
+        skills=[language, *filter(None, gap_skills)]
+    )
+
+    # 5️⃣ Generate final guidance
+    final_answer = await generate_answer(
+        question=query,
+        context=context_chunks
+    )
+
+    return context_chunks, final_answer
 
 
 async def unified_ai_pipeline(
@@ -12,8 +89,18 @@ async def unified_ai_pipeline(
     diagnostics: str | None = None,
     user_id: str | None = None
 ):
+    """
+    analysis ─┬─ skill-state persistence (background, one bulk_write)
+              └─ retrieval ── guidance
+    """
+
     # 1️⃣ Analyze code
-    raw_result = analyze_skill(code, language, diagnostics)
+    with span("pipeline.analysis"):
+        raw_result = await analyze_skill(
+            language=language,
+            code=code,
+            combined_context=diagnostics or ""
+        )
 
     if not isinstance(raw_result, dict):
         print("⚠️ analyze_skill returned non-dict:", raw_result)
@@ -31,43 +118,18 @@ async def unified_ai_pipeline(
         "next_steps": raw_result.get("next_steps", [])
     }
 
-
-    # 2️⃣ Persist skill state
+    # 2️⃣ Persist skill state, off the response's critical path
     if user_id:
-        await upsert_skill_state(
-            user_id=user_id,
-            skill=normalize(language),
-            estimated_level=estimated_level,
-            confidence_score=confidence_score
+        run_in_background(
+            bulk_upsert_skill_states(
+                user_id,
+                skill_state_updates(language, skill_gaps, estimated_level, confidence_score)
+            ),
+            "skill state update"
         )
 
-        for gap in skill_gaps:
-            normalized = normalize_gap_to_skill(gap)
-            if not normalized:
-                continue
-
-            await upsert_skill_state(
-                user_id=user_id,
-                skill=normalized,
-                estimated_level=max(1, estimated_level - 1),
-                confidence_score=confidence_score * 0.8
-            )
-
-    # 3️⃣ Build RAG query
-    query = (
-        f"Explain and improve: {', '.join(skill_gaps)}"
-        if skill_gaps
-        else f"Improve and optimize this {language} code"
-    )
-
-    # 4️⃣ Retrieve knowledge
-    context_chunks = await retrieve_context(query, top_k=5)
-
-    # 5️⃣ Generate final guidance
-    final_answer = generate_answer(
-        question=query,
-        context="\n".join(context_chunks)
-    )
+    # 3️⃣–5️⃣ run while the states are being written
+    context_chunks, final_answer = await _guidance(language, skill_gaps)
 
     if isinstance(final_answer, str):
         final_answer = [final_answer]
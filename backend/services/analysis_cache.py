@@ -0,0 +1,158 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from backend.database import analysis_cache_collection
+
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "2000"))
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600)))
+
+# languages whose meaning depends on indentation keep their leading whitespace
+_INDENTED = {"python", "py", "yaml", "yml", "haskell", "fsharp", "nim"}
+# comments are only stripped where the syntax is known; elsewhere "//"
+# and "/*" can be ordinary text (URLs, globs), so only whitespace goes
+_HASH_COMMENTS = {
+    "python", "py", "ruby", "rb", "shell", "shellscript", "bash", "sh", "zsh",
+    "yaml", "yml", "r", "perl", "dockerfile", "makefile", "toml", "powershell"
+}
+_C_STYLE = {
+    "c", "cpp", "c++", "objective-c", "objective-cpp", "java", "javascript", "js",
+    "javascriptreact", "typescript", "ts", "typescriptreact", "go", "rust",
+    "csharp", "kotlin", "swift", "scala", "dart", "php"
+}
+
+# strings are matched first so comment markers inside them are left alone
+_STRING = r"\"\"\"[\s\S]*?\"\"\"|'''[\s\S]*?'''|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`"
+_C_COMMENTS = re.compile(rf"({_STRING})|//[^\n]*|/\*[\s\S]*?\*/")
+_HASH_COMMENT = re.compile(rf"({_STRING})|#[^\n]*")
+
+
+def normalize_code(language: str, code: str) -> str:
+    """
+    Drop comments (for languages with a known comment syntax), trailing
+    whitespace and blank lines, so saving a file with only cosmetic
+    edits maps to the same cache entry
+    """
+    language = (language or "").lower()
+    if language in _HASH_COMMENTS:
+        code = _HASH_COMMENT.sub(lambda m: m.group(1) or "", code)
+    elif language in _C_STYLE:
+        code = _C_COMMENTS.sub(lambda m: m.group(1) or "", code)
+
+    lines = []
+    for line in code.splitlines():
+        line = line.rstrip() if language in _INDENTED else line.strip()
+        if line:
+            lines.append(line)
+
+    return "\n".join(lines)
+
+
+def analysis_key(language: str, code: str, context: str, prompt_version: str) -> str:
+    digest = hashlib.sha256()
+    for part in ((language or "").lower(), normalize_code(language, code), context or ""):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return f"{prompt_version}:{digest.hexdigest()}"
+
+
+class AnalysisCache:
+    """
+    Two-tier cache for LLM code analysis results.
+    - Bounded in-process LRU (answers in microseconds)
+    - Mongo collection with a TTL index, shared across workers and restarts
+    Keys embed the prompt version, so a template change starts fresh.
+    """
+
+    def __init__(self, max_size: int = ANALYSIS_CACHE_SIZE, ttl: int = ANALYSIS_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, result: dict, expires: float):
+        with self._lock:
+            self._entries[key] = (expires, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_local(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    async def get(self, key: str) -> Optional[dict]:
+        result = self.get_local(key)
+        if result is not None:
+            return result
+
+        try:
+            doc = await analysis_cache_collection.find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+                {"result": 1, "expires_at": 1}
+            )
+        except Exception as e:
+            print("⚠️ Analysis cache lookup failed:", e)
+            doc = None
+
+        # entries written before results were stored as documents
+        if doc is None or not isinstance(doc.get("result"), dict):
+            self.misses += 1
+            return None
+
+        expires = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+        self._remember(key, doc["result"], time.time() + expires)
+        self.db_hits += 1
+        return doc["result"]
+
+    async def put(self, key: str, result: dict):
+        self._remember(key, result, time.time() + self.ttl)
+
+        now = datetime.utcnow()
+        try:
+            await analysis_cache_collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "result": result,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            print("⚠️ Analysis cache write failed:", e)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.db_hits + self.misses
+
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.db_hits) / lookups, 4) if lookups else 0.0
+        }
+
+
+analysis_cache = AnalysisCache()
@@ -0,0 +1,274 @@
+import os
+import uuid
+import socket
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from backend.database import analysis_jobs_collection
+from backend.services.incremental_analysis import analyze_submission
+from backend.services.skill_history_service import record_daily_score
+from backend.services.llm_scheduler import BACKGROUND
+from backend.services.tracing import span
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+# a running job whose lease ran out (worker crashed) is picked up again
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = {DONE, FAILED}
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# job id → events of the waiters to wake when it finishes in this process
+_waiters: Dict[str, Set[asyncio.Event]] = {}
+
+
+def job_view(job: dict) -> dict:
+    """
+    The API shape of a job document
+    """
+
+    def iso(value: Optional[datetime]) -> Optional[str]:
+        return value.isoformat() + "Z" if value else None
+
+    view = {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+        "created_at": iso(job.get("created_at")),
+        "started_at": iso(job.get("started_at")),
+        "finished_at": iso(job.get("finished_at"))
+    }
+
+    if job["status"] == DONE:
+        view["analysis"] = job.get("result")
+    elif job["status"] == FAILED:
+        view["error"] = job.get("error")
+
+    return view
+
+
+# -------------------------------------------------
+# 📥 SUBMIT / LOOKUP
+# -------------------------------------------------
+async def submit_job(
+    user_id: str,
+    request: dict,
+    idempotency_key: Optional[str] = None
+) -> Tuple[dict, bool]:
+    """
+    Queue an analysis and return (job, created).
+    Resubmitting with the same idempotency key returns the original
+    job, whatever its state, so client retries never re-run the LLM.
+    """
+
+    job = {
+        "_id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "request": request,
+        "status": QUEUED,
+        "attempts": 0,
+        "created_at": datetime.utcnow()
+    }
+    if idempotency_key:
+        job["idempotency_key"] = idempotency_key
+
+    try:
+        await analysis_jobs_collection.insert_one(job)
+    except DuplicateKeyError:
+        existing = await analysis_jobs_collection.find_one(
+            {"user_id": user_id, "idempotency_key": idempotency_key}
+        )
+        if existing is not None:
+            return existing, False
+        raise
+
+    job_workers.notify()
+    return job, True
+
+
+async def get_job(user_id: str, job_id: str) -> Optional[dict]:
+    return await analysis_jobs_collection.find_one(
+        {"_id": job_id, "user_id": user_id},
+        {"request": 0}
+    )
+
+
+async def wait_for_job(job_id: str, timeout: float = JOB_POLL_SECONDS):
+    """
+    Return when the job finishes in this process or the timeout passes;
+    callers re-read the job either way (it may run in another process)
+    """
+    event = asyncio.Event()
+    waiters = _waiters.setdefault(job_id, set())
+    waiters.add(event)
+
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        waiters.discard(event)
+        if not waiters:
+            _waiters.pop(job_id, None)
+
+
+def _notify_finished(job_id: str):
+    for event in _waiters.pop(job_id, ()):
+        event.set()
+
+
+# -------------------------------------------------
+# ⚙️ WORKERS
+# -------------------------------------------------
+async def claim_job() -> Optional[dict]:
+    """
+    Atomically move the oldest runnable job to "running" under a lease
+    """
+    now = datetime.utcnow()
+
+    return await analysis_jobs_collection.find_one_and_update(
+        {"$or": [
+            {"status": QUEUED},
+            {"status": RUNNING, "lease_until": {"$lt": now}}
+        ]},
+        {
+            "$set": {
+                "status": RUNNING,
+                "started_at": now,
+                "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                "worker": WORKER_ID
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _finish(job: dict, status: str, **fields):
+    now = datetime.utcnow()
+
+    await analysis_jobs_collection.update_one(
+        {"_id": job["_id"], "worker": WORKER_ID},
+        {
+            "$set": {
+                "status": status,
+                "finished_at": now,
+                "expires_at": now + timedelta(seconds=JOB_RETENTION_SECONDS),
+                **fields
+            },
+            "$unset": {"lease_until": ""}
+        }
+    )
+    _notify_finished(job["_id"])
+
+
+async def run_job(job: dict):
+    if job["attempts"] > JOB_MAX_ATTEMPTS:
+        await _finish(job, FAILED, error="Job abandoned after repeated worker failures")
+        return
+
+    try:
+        with span("job.analysis"):
+            result = await analyze_submission(
+                job["user_id"], **job["request"], priority=BACKGROUND
+            )
+        await record_daily_score(job["user_id"])
+
+    except asyncio.CancelledError:
+        # shutting down: hand the job back instead of waiting for the lease
+        await analysis_jobs_collection.update_one(
+            {"_id": job["_id"], "worker": WORKER_ID},
+            {"$set": {"status": QUEUED}, "$unset": {"lease_until": ""}}
+        )
+        raise
+
+    except Exception as e:
+        print(f"⚠️ Analysis job {job['_id']} failed:", e)
+        await _finish(job, FAILED, error=str(e))
+        return
+
+    await _finish(job, DONE, result=result)
+
+
+class JobWorkers:
+    """
+    Bounded pool of in-process workers fed from the analysis_jobs
+    collection. Submits wake an idle worker at once; otherwise workers
+    poll, which also picks up jobs queued by other processes.
+    """
+
+    def __init__(self, size: int = JOB_WORKERS):
+        self.size = size
+        self._tasks: List[asyncio.Task] = []
+        self._wake = asyncio.Event()
+        self.completed = 0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"analysis-job-worker-{n}")
+            for n in range(self.size)
+        ]
+        print(f"✅ Analysis job workers started ({self.size})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            # cleared before claiming, so a submit during the claim is not lost
+            self._wake.clear()
+
+            try:
+                job = await claim_job()
+            except Exception as e:
+                print("⚠️ Job claim failed:", e)
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Job {job['_id']} could not be finalized:", e)
+            self.completed += 1
+
+    async def stats(self) -> dict:
+        counts = {
+            doc["_id"]: doc["count"]
+            async for doc in analysis_jobs_collection.aggregate([
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ])
+        }
+
+        return {
+            "workers": len(self._tasks),
+            "completed_here": self.completed,
+            "jobs": {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED)}
+        }
+
+
+job_workers = JobWorkers()
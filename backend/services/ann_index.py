@@ -0,0 +1,519 @@
+"""
+IVF (inverted file) approximate nearest-neighbour index for skill_knowledge.
+
+The index is built offline from Mongo and written as plain .npy files,
+then opened with mmap so every uvicorn worker shares the same pages.
+
+    python -m backend.services.ann_index build [--nlist N]
+    python -m backend.services.ann_index recall [--top-k 5] [--nprobe 1,4,8,16]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from backend.services.embedding_codec import decode_embedding
+from backend.services.lexical_index import BM25Index, LexicalSegment, save_segment
+from backend.services.vector_index import (
+    Hit,
+    normalize_rows,
+    partition_key,
+    top_k_indices
+)
+
+ANN_INDEX_DIR = Path(os.getenv(
+    "ANN_INDEX_DIR",
+    Path(__file__).resolve().parents[2] / "data" / "ann_index"
+))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "8"))
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLES_PER_LIST = 256
+ASSIGN_BLOCK = 65536
+
+
+# =================================================
+# 🔹 K-MEANS (spherical, NumPy only)
+# =================================================
+
+def default_nlist(n: int) -> int:
+    return max(1, int(np.sqrt(n)))
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BLOCK):
+        block = vectors[start:start + ASSIGN_BLOCK]
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(
+    vectors: np.ndarray,
+    nlist: int,
+    iterations: int = KMEANS_ITERATIONS,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Spherical k-means on a sample of the (normalized) vectors
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * KMEANS_SAMPLES_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=nlist)
+
+        # re-seed empty lists with random sample points
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+# =================================================
+# 🔹 INDEX
+# =================================================
+
+class IVFIndex:
+    """
+    Read-only IVF index. Rows are grouped by list, so probing a list
+    is one contiguous slice of the (memory-mapped) vector matrix.
+    skill_rows holds row numbers grouped by skill (see meta["skills"]),
+    which lets a filtered query touch only its own partition.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        vectors: np.ndarray,
+        offsets: np.ndarray,
+        ids: np.ndarray,
+        content_blob: np.ndarray,
+        content_offsets: np.ndarray,
+        meta: dict,
+        skill_codes: Optional[np.ndarray] = None,
+        skill_rows: Optional[np.ndarray] = None,
+        skill_offsets: Optional[np.ndarray] = None,
+        sorted_ids: Optional[np.ndarray] = None,
+        sorted_rows: Optional[np.ndarray] = None
+    ):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.offsets = offsets
+        self.ids = ids
+        self.content_blob = content_blob
+        self.content_offsets = content_offsets
+        self.meta = meta
+        self.skill_codes = skill_codes
+        self.skill_rows = skill_rows
+        self.skill_offsets = skill_offsets
+        # ids in sorted order and the row of each, for binary-search lookups
+        self.sorted_ids = sorted_ids
+        self.sorted_rows = sorted_rows
+        # keyed through partition_key, so snapshots written before
+        # aliases were normalized still answer canonical skill filters
+        self._skill_index = {}
+        for code, name in enumerate(meta.get("skills", [])):
+            self._skill_index.setdefault(partition_key(name), []).append(code)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def last_id(self) -> Optional[str]:
+        return self.meta.get("last_id")
+
+    def content(self, row: int) -> str:
+        start, end = self.content_offsets[row], self.content_offsets[row + 1]
+        return bytes(self.content_blob[start:end]).decode("utf-8")
+
+    def _hits(self, rows: np.ndarray, scores: np.ndarray) -> List[Hit]:
+        return [
+            Hit(float(scores[i]), self.ids[rows[i]].decode(), self.content(rows[i]))
+            for i in range(len(rows))
+        ]
+
+    def documents(self):
+        """
+        {_id, content, skill} for every row (used to build side indexes)
+        """
+        names = self.meta.get("skills", [])
+        for row in range(len(self)):
+            yield {
+                "_id": self.ids[row].decode(),
+                "content": self.content(row),
+                "skill": names[self.skill_codes[row]] if self.skill_codes is not None else None
+            }
+
+    def _skill_codes(self, skills) -> List[int]:
+        return [c for s in skills for c in self._skill_index.get(s, [])]
+
+    def partition_size(self, skills) -> int:
+        if self.skill_offsets is None:
+            return 0
+        return int(sum(
+            self.skill_offsets[c + 1] - self.skill_offsets[c]
+            for c in self._skill_codes(skills)
+        ))
+
+    def _partition_rows(self, codes: List[int]) -> np.ndarray:
+        return np.concatenate([
+            self.skill_rows[self.skill_offsets[c]:self.skill_offsets[c + 1]]
+            for c in codes
+        ]) if codes else np.empty(0, dtype=np.int64)
+
+    def _probe_rows(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        lists = top_k_indices(self.centroids @ query, nprobe)
+        return np.concatenate([
+            np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists
+        ]) if len(lists) else np.empty(0, dtype=np.int64)
+
+    def search(
+        self,
+        query_vec,
+        top_k: int = 3,
+        nprobe: int = ANN_NPROBE,
+        skills: Optional[List[str]] = None
+    ) -> List[Hit]:
+        """
+        Approximate cosine top-k over the nprobe closest lists.
+        With skills, partitions smaller than one probe are scanned
+        exactly; larger ones are probed and filtered by skill.
+        """
+        if len(self) == 0:
+            return []
+
+        query = normalize_rows(np.asarray(query_vec).reshape(1, -1))[0]
+
+        if skills is None or self.skill_codes is None:
+            rows = self._probe_rows(query, nprobe)
+        else:
+            codes = self._skill_codes(skills)
+            probe_cost = len(self) * min(nprobe, self.nlist) / self.nlist
+
+            if self.partition_size(skills) <= probe_cost:
+                rows = np.sort(self._partition_rows(codes))
+            else:
+                rows = self._probe_rows(query, nprobe)
+                rows = rows[np.isin(self.skill_codes[rows], codes)]
+
+        scores = self.vectors[rows] @ query
+        best = top_k_indices(scores, top_k)
+
+        return self._hits(rows[best], scores[best])
+
+    def score_ids(self, query_vec, doc_ids) -> List[Hit]:
+        """
+        Exact cosine scores for just these chunks
+        """
+        rows = self.rows_of(doc_ids)
+        if not len(rows):
+            return []
+
+        query = normalize_rows(np.asarray(query_vec).reshape(1, -1))[0]
+        return self._hits(rows, self.vectors[rows] @ query)
+
+    def rows_of(self, doc_ids) -> np.ndarray:
+        """
+        Rows of these ids (unknown ids are skipped), by binary search
+        over the saved sorted ids, so no per-worker id map is built
+        """
+        if self.sorted_ids is None:
+            # snapshots built before the sorted ids were saved
+            self.sorted_rows = np.argsort(self.ids, kind="stable")
+            self.sorted_ids = self.ids[self.sorted_rows]
+
+        keys = np.array([d.encode() for d in doc_ids])
+        if not len(keys) or not len(self.sorted_ids):
+            return np.empty(0, dtype=np.int64)
+
+        positions = np.searchsorted(self.sorted_ids, keys)
+        positions = np.minimum(positions, len(self.sorted_ids) - 1)
+        found = self.sorted_ids[positions] == keys
+
+        return np.asarray(self.sorted_rows[positions[found]], dtype=np.int64)
+
+    def exact_search(self, query_vec, top_k: int = 3) -> List[Hit]:
+        """
+        Brute-force reference used by the recall check
+        """
+        if len(self) == 0:
+            return []
+
+        query = normalize_rows(np.asarray(query_vec).reshape(1, -1))[0]
+        scores = np.asarray(self.vectors @ query)
+        best = top_k_indices(scores, top_k)
+
+        return self._hits(best, scores[best])
+
+
+def build_ivf(
+    ids: List[str],
+    contents: List[str],
+    vectors: np.ndarray,
+    nlist: Optional[int] = None,
+    meta: Optional[dict] = None,
+    skills: Optional[List[str]] = None
+) -> IVFIndex:
+    """
+    Cluster the vectors and lay rows out grouped by list
+    """
+    vectors = normalize_rows(vectors)
+    nlist = min(nlist or default_nlist(len(vectors)), len(vectors))
+
+    centroids = train_centroids(vectors, nlist)
+    labels = _assign(vectors, centroids)
+
+    order = np.argsort(labels, kind="stable")
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(labels, minlength=nlist))
+
+    encoded = [contents[i].encode("utf-8") for i in order]
+    content_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    content_offsets[1:] = np.cumsum([len(c) for c in encoded])
+
+    keys = [partition_key(skills[i] if skills else None) for i in order]
+    skill_names = sorted(set(keys))
+    skill_codes = np.searchsorted(skill_names, keys).astype(np.int32)
+    skill_offsets = np.zeros(len(skill_names) + 1, dtype=np.int64)
+    skill_offsets[1:] = np.cumsum(np.bincount(skill_codes, minlength=len(skill_names)))
+
+    row_ids = np.array([ids[i].encode() for i in order])
+    sorted_rows = np.argsort(row_ids, kind="stable")
+
+    return IVFIndex(
+        centroids=centroids,
+        vectors=vectors[order],
+        offsets=offsets,
+        ids=row_ids,
+        content_blob=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        content_offsets=content_offsets,
+        meta={
+            **(meta or {}),
+            "size": len(vectors),
+            "nlist": nlist,
+            "skills": skill_names
+        },
+        skill_codes=skill_codes,
+        skill_rows=np.argsort(skill_codes, kind="stable"),
+        skill_offsets=skill_offsets,
+        sorted_ids=row_ids[sorted_rows],
+        sorted_rows=sorted_rows
+    )
+
+
+# =================================================
+# 🔹 ON-DISK FORMAT (mmap)
+# =================================================
+
+_ARRAYS = ("centroids", "vectors", "offsets", "ids", "content_offsets")
+_SKILL_ARRAYS = ("skill_codes", "skill_rows", "skill_offsets")
+_ID_ARRAYS = ("sorted_ids", "sorted_rows")
+
+
+def save_ivf(
+    index: IVFIndex,
+    path: Path = ANN_INDEX_DIR,
+    lexical: Optional[LexicalSegment] = None
+):
+    """
+    Write to a sibling temp dir, then swap it in. Workers that still
+    map the old files keep reading them until they reopen.
+    lexical (the same rows' BM25 postings) is swapped in with it.
+    """
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    old = path.with_name(f"{path.name}.old-{os.getpid()}")
+
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    for name in _ARRAYS + _SKILL_ARRAYS + _ID_ARRAYS:
+        np.save(tmp / f"{name}.npy", np.ascontiguousarray(getattr(index, name)))
+
+    (tmp / "content.bin").write_bytes(index.content_blob.tobytes())
+    (tmp / "meta.json").write_text(json.dumps(index.meta))
+
+    if lexical is not None:
+        save_segment(lexical, tmp)
+
+    if path.exists():
+        path.rename(old)
+    tmp.rename(path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def open_ivf(path: Path = ANN_INDEX_DIR) -> Optional[IVFIndex]:
+    """
+    Memory-map a saved index, or None when there is none
+    """
+    path = Path(path)
+    if not (path / "meta.json").exists():
+        return None
+
+    arrays = {
+        name: np.load(path / f"{name}.npy", mmap_mode="r")
+        for name in _ARRAYS + _SKILL_ARRAYS + _ID_ARRAYS
+        # older snapshots lack the skill and sorted-id arrays
+        if name in _ARRAYS or (path / f"{name}.npy").exists()
+    }
+
+    blob_path = path / "content.bin"
+    content_blob = (
+        np.memmap(blob_path, dtype=np.uint8, mode="r")
+        if blob_path.stat().st_size else np.empty(0, dtype=np.uint8)
+    )
+
+    return IVFIndex(
+        content_blob=content_blob,
+        meta=json.loads((path / "meta.json").read_text()),
+        **arrays
+    )
+
+
+# =================================================
+# 🔹 BUILD FROM MONGO + RECALL CHECK
+# =================================================
+
+async def build_from_collection(nlist: Optional[int] = None) -> IVFIndex:
+    from backend.database import knowledge_collection
+
+    ids, contents, vectors, skills = [], [], [], []
+
+    cursor = knowledge_collection.find(
+        {},
+        {
+            "content": 1,
+            "skill": 1,
+            "embedding": 1,
+            "embedding_format": 1,
+            "embedding_scale": 1
+        }
+    ).sort("_id", 1)
+
+    async for doc in cursor:
+        if doc.get("embedding") is None:
+            continue
+        ids.append(str(doc["_id"]))
+        contents.append(doc["content"])
+        skills.append(doc.get("skill"))
+        vectors.append(decode_embedding(doc).astype(np.float32))
+
+    if not vectors:
+        raise RuntimeError("skill_knowledge has no embedded chunks")
+
+    return build_ivf(
+        ids,
+        contents,
+        np.vstack(vectors),
+        nlist=nlist,
+        meta={
+            "last_id": ids[-1],
+            "built_at": datetime.utcnow().isoformat()
+        },
+        skills=skills
+    )
+
+
+def recall_at_k(
+    index: IVFIndex,
+    queries: np.ndarray,
+    top_k: int = 5,
+    nprobe: int = ANN_NPROBE
+) -> dict:
+    """
+    Fraction of the exact top-k that the IVF search also returns
+    """
+    found = 0
+    elapsed = 0.0
+
+    for query in queries:
+        exact = {h.doc_id for h in index.exact_search(query, top_k)}
+
+        started = time.perf_counter()
+        approx = {h.doc_id for h in index.search(query, top_k, nprobe)}
+        elapsed += time.perf_counter() - started
+
+        found += len(exact & approx)
+
+    return {
+        "nprobe": nprobe,
+        "recall": round(found / (len(queries) * top_k), 4),
+        "avg_ms": round(elapsed / len(queries) * 1000, 3)
+    }
+
+
+def sample_queries(
+    index: IVFIndex,
+    count: int = 200,
+    noise: float = 0.05,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Perturbed copies of stored vectors, so queries are realistic but
+    do not sit exactly on an indexed point
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(index), min(count, len(index)), replace=False)
+    base = np.asarray(index.vectors[np.sort(rows)])
+    return normalize_rows(base + rng.normal(0, noise, base.shape))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="build from skill_knowledge and save")
+    build.add_argument("--nlist", type=int, default=None)
+    build.add_argument("--path", type=Path, default=ANN_INDEX_DIR)
+
+    recall = sub.add_parser("recall", help="compare IVF against brute force")
+    recall.add_argument("--path", type=Path, default=ANN_INDEX_DIR)
+    recall.add_argument("--queries", type=int, default=200)
+    recall.add_argument("--top-k", type=int, default=5)
+    recall.add_argument("--nprobe", default="1,2,4,8,16,32")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = asyncio.run(build_from_collection(args.nlist))
+
+        # BM25 postings for the same rows, so workers only map them
+        lexical = BM25Index()
+        lexical.add(index.documents())
+
+        save_ivf(index, args.path, lexical=lexical.freeze())
+        print(f"✅ ANN index saved: {index.meta} (+ {len(lexical)} BM25 docs) → {args.path}")
+        return
+
+    index = open_ivf(args.path)
+    if index is None:
+        raise SystemExit(f"❌ No ANN index at {args.path}")
+
+    queries = sample_queries(index, args.queries)
+    for nprobe in (int(p) for p in args.nprobe.split(",")):
+        print(recall_at_k(index, queries, args.top_k, nprobe))
+
+
+if __name__ == "__main__":
+    main()
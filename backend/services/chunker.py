@@ -0,0 +1,268 @@
+import os
+import re
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "160"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+# rough English/code average; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+class StreamingChunker:
+    """
+    Push-based chunker: feed() text as it arrives, close() at the end.
+    - Packs whole sentences / paragraphs up to max_tokens
+    - Keeps fenced code blocks together (split by lines only if too big)
+    - Carries a short trailing sentence into the next chunk as overlap
+    Memory stays bounded by a few chunks, whatever the input size.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = CHUNK_MAX_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+    ):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.max_chars = max_tokens * CHARS_PER_TOKEN
+        self._partial = ""
+        self._paragraph: List[str] = []
+        self._paragraph_chars = 0
+        self._fence: Optional[List[str]] = None
+        self._fence_chars = 0
+        self._fence_split = False
+        self._continued = False
+        self._mid_paragraph = False
+        self._units: List[tuple] = []  # (text, joiner, kind)
+        self._tokens = 0
+        self._carried = False
+        self._ready: List[str] = []
+
+    # ---------------- public ----------------
+
+    def feed(self, text: str) -> List[str]:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+
+        for line in lines:
+            self._line(line)
+
+        # a single endless line must not grow without bound: cut it at
+        # fixed offsets and treat the pieces as one continued line
+        limit = self.max_chars * 4
+        while len(self._partial) > limit:
+            self._line(self._partial[:limit], continues=True)
+            self._partial = self._partial[limit:]
+
+        return self._drain()
+
+    def close(self) -> List[str]:
+        if self._partial:
+            self._line(self._partial)
+            self._partial = ""
+
+        if self._fence is not None:
+            self._end_fence()
+        self._end_paragraph()
+        self._emit(carry=False)
+
+        return self._drain()
+
+    # ---------------- lines → units ----------------
+
+    def _line(self, line: str, continues: bool = False):
+        continued, self._continued = self._continued, continues
+
+        if not continued and _FENCE_RE.match(line):
+            if self._fence is None:
+                self._end_paragraph()
+                self._fence = [line]
+                self._fence_chars = len(line)
+                self._fence_split = False
+            else:
+                self._fence.append(line)
+                self._end_fence()
+            return
+
+        if self._fence is not None:
+            if continued:
+                self._fence[-1] += line
+            else:
+                self._fence.append(line)
+            self._fence_chars += len(line) + 1
+            if self._fence_chars > self.max_chars:
+                self._fence = self._flush_code(self._fence, final=False)
+                self._fence_chars = sum(len(l) + 1 for l in self._fence)
+            return
+
+        if not continued and not line.strip():
+            self._end_paragraph()
+            return
+
+        if continued and self._paragraph:
+            self._paragraph[-1] += line
+        else:
+            self._paragraph.append(line)
+        self._paragraph_chars += len(line) + 1
+
+        if self._paragraph_chars > self.max_chars * 4:
+            self._end_paragraph(keep_tail=True)
+
+    def _end_paragraph(self, keep_tail: bool = False):
+        if not self._paragraph:
+            self._mid_paragraph = self._mid_paragraph and keep_tail
+            return
+
+        text = "\n".join(self._paragraph)
+        tail = ""
+
+        if keep_tail:
+            # hold back the (possibly unfinished) last sentence
+            boundaries = list(_SENTENCE_RE.finditer(text))
+            if boundaries:
+                text, tail = text[:boundaries[-1].start()], text[boundaries[-1].end():]
+
+        sentences = [s.strip() for s in _SENTENCE_RE.split(text)]
+
+        for sentence in (s for s in sentences if s):
+            self._add(sentence, " " if self._mid_paragraph else "\n\n", "sentence")
+            self._mid_paragraph = True
+
+        self._paragraph = [tail] if tail else []
+        self._paragraph_chars = len(tail)
+        self._mid_paragraph = keep_tail and self._mid_paragraph
+
+    def _end_fence(self):
+        self._flush_code(self._fence, final=True)
+        self._fence, self._fence_chars = None, 0
+
+    def _flush_code(self, lines: List[str], final: bool) -> List[str]:
+        """
+        Emit full line groups of a code block; unless final, the last
+        (possibly short) group is returned to keep accumulating
+        """
+        groups, block, size = [], [], 0
+        for line in lines:
+            if block and size + len(line) + 1 > self.max_chars:
+                groups.append(block)
+                block, size = [], 0
+            block.append(line)
+            size += len(line) + 1
+
+        if final:
+            groups.append(block)
+            block = []
+
+        for group in groups:
+            if any(line.strip() for line in group):
+                # continuation of a split block stays visually attached
+                self._add("\n".join(group), "\n" if self._fence_split else "\n\n", "code")
+                self._fence_split = True
+
+        return block
+
+    # ---------------- units → chunks ----------------
+
+    def _add(self, text: str, joiner: str, kind: str):
+        tokens = estimate_tokens(text)
+
+        if tokens > self.max_tokens:
+            for piece in self._hard_split(text):
+                self._add(piece, " " if kind == "sentence" else "\n", kind)
+            return
+
+        if self._units and self._tokens + tokens > self.max_tokens:
+            if self._carried and len(self._units) == 1:
+                # only the overlap is pending; drop it rather than emit a repeat
+                self._units, self._tokens = [], 0
+            else:
+                # code starts clean; prose overlap only if it still fits
+                self._emit(carry=kind != "code")
+                if self._carried and self._tokens + tokens > self.max_tokens:
+                    self._units, self._tokens, self._carried = [], 0, False
+
+        self._units.append((text, joiner if self._units else "", kind))
+        self._tokens += tokens
+        self._carried = False
+
+    def _emit(self, carry: bool):
+        if not self._units or (self._carried and len(self._units) == 1):
+            self._units, self._tokens, self._carried = [], 0, False
+            return
+
+        chunk = "".join(joiner + text for text, joiner, _ in self._units)
+        self._ready.append(chunk.strip())
+
+        last_text, _, last_kind = self._units[-1]
+        self._units, self._tokens, self._carried = [], 0, False
+
+        if carry and last_kind == "sentence" and estimate_tokens(last_text) <= self.overlap_tokens:
+            self._units = [(last_text, "", last_kind)]
+            self._tokens = estimate_tokens(last_text)
+            self._carried = True
+
+    def _hard_split(self, text: str) -> Iterator[str]:
+        piece = ""
+        for word in re.split(r"(\s+)", text):
+            while len(word) > self.max_chars:
+                if piece:
+                    yield piece
+                    piece = ""
+                yield word[:self.max_chars]
+                word = word[self.max_chars:]
+
+            if len(piece) + len(word) > self.max_chars:
+                yield piece
+                piece = word.lstrip()
+            else:
+                piece += word
+
+        if piece.strip():
+            yield piece
+
+    def _drain(self) -> List[str]:
+        ready, self._ready = [c for c in self._ready if c], []
+        return ready
+
+
+def chunk_stream(
+    pieces: Iterable[str],
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> Iterator[str]:
+    chunker = StreamingChunker(max_tokens, overlap_tokens)
+    for piece in pieces:
+        yield from chunker.feed(piece)
+    yield from chunker.close()
+
+
+async def achunk_stream(
+    pieces: AsyncIterable[str],
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> AsyncIterator[str]:
+    chunker = StreamingChunker(max_tokens, overlap_tokens)
+    async for piece in pieces:
+        for chunk in chunker.feed(piece):
+            yield chunk
+    for chunk in chunker.close():
+        yield chunk
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> Iterator[str]:
+    """
+    Sentence / paragraph / code-fence aware chunks of a single text
+    """
+    return chunk_stream([text], max_tokens, overlap_tokens)
@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "20000"))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH")  # sqlite file, unset = memory only
+
+
+def cache_key(model_name: str, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model_name}:{digest}"
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed on (model name, text hash).
+    - Bounded in-memory LRU
+    - Optional sqlite tier that survives restarts and is shared by workers
+    """
+
+    def __init__(self, max_size: int = EMBED_CACHE_SIZE, path: Optional[str] = None):
+        self.max_size = max_size
+        self.path = path
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Memory-tier lookup only; misses are counted by get_many
+        """
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return vector
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        missing = []
+
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is None:
+                    missing.append(key)
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = vector
+            self.hits += len(found)
+
+            if missing and self._db is not None:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    missing
+                ).fetchall()
+
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    self._remember(key, vector)
+                    found[key] = vector
+                self.disk_hits += len(rows)
+
+            self.misses += len(set(keys) - found.keys())
+
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, np.ndarray]]):
+        rows = []
+
+        with self._lock:
+            for key, vector in items:
+                vector = np.asarray(vector, dtype=np.float32)
+                vector.setflags(write=False)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes()))
+
+            if rows and self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    rows
+                )
+                self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "persistent": self._db is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+        }
+
+
+embedding_cache = EmbeddingCache(path=EMBED_CACHE_PATH)
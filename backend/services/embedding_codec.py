@@ -0,0 +1,68 @@
+import os
+from typing import Optional
+
+import numpy as np
+from bson import Binary
+
+# "float16" | "int8" | "list" (legacy BSON array of doubles)
+EMBEDDING_FORMAT = os.getenv("EMBEDDING_FORMAT", "float16")
+
+FORMATS = ("float16", "int8", "list")
+
+
+def quantize_int8(vector: np.ndarray):
+    """
+    Symmetric per-vector int8: vector ≈ codes * scale
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    peak = float(np.abs(vector).max()) if vector.size else 0.0
+    scale = peak / 127 if peak else 1.0
+    codes = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+
+def encode_embedding(vector, fmt: str = EMBEDDING_FORMAT) -> dict:
+    """
+    Document fields for one embedding in the given storage format
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+
+    if fmt == "list":
+        return {"embedding": vector.tolist()}
+
+    if fmt == "float16":
+        return {
+            "embedding": Binary(vector.astype("<f2").tobytes()),
+            "embedding_format": "float16"
+        }
+
+    if fmt == "int8":
+        codes, scale = quantize_int8(vector)
+        return {
+            "embedding": Binary(codes.tobytes()),
+            "embedding_format": "int8",
+            "embedding_scale": scale
+        }
+
+    raise ValueError(f"Unknown embedding format: {fmt}")
+
+
+def decode_embedding(doc: dict) -> Optional[np.ndarray]:
+    """
+    Embedding of a stored chunk. Binary formats are read with
+    np.frombuffer (no copy); int8 is rescaled to float32.
+    """
+    raw = doc.get("embedding")
+    if raw is None:
+        return None
+
+    fmt = doc.get("embedding_format")
+
+    if fmt == "float16":
+        return np.frombuffer(raw, dtype="<f2")
+
+    if fmt == "int8":
+        codes = np.frombuffer(raw, dtype=np.int8)
+        return codes.astype(np.float32) * np.float32(doc.get("embedding_scale", 1.0))
+
+    return np.asarray(raw, dtype=np.float32)
@@ -1,5 +1,17 @@
+import os
+import asyncio
+import contextvars
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from sentence_transformers import SentenceTransformer
 import numpy as np
+from backend.services.embedding_cache import cache_key, embedding_cache
+from backend.services.tracing import span
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
 
 _model = None  # lazy-loaded
 
@@ -8,7 +20,7 @@ def get_model():
     global _model
     if _model is None:
         try:
-            _model = SentenceTransformer("all-MiniLM-L6-v2")
+            _model = SentenceTransformer(MODEL_NAME)
         except Exception as e:
             raise RuntimeError(
                 "Embedding model could not be loaded. "
@@ -18,10 +30,184 @@ def get_model():
 
 
 def embed_text(text: str) -> np.ndarray:
+    key = cache_key(MODEL_NAME, text)
+    cached = embedding_cache.get_many([key]).get(key)
+    if cached is not None:
+        return cached
+
     try:
         model = get_model()
-        return model.encode(text)
+        vector = model.encode(text)
     except Exception:
-        # fallback dummy vector (safe)
+        # fallback dummy vector (safe, never cached)
         return np.zeros(384)
 
+    embedding_cache.put_many([(key, vector)])
+    return vector
+
+
+def embed_texts(texts: List[str], batch_size: int = 64) -> np.ndarray:
+    """
+    Batched encode: cached texts are skipped, the rest
+    run one forward pass per batch_size texts
+    """
+    if not texts:
+        return np.zeros((0, 384), dtype=np.float32)
+
+    keys = [cache_key(MODEL_NAME, t) for t in texts]
+    vectors = embedding_cache.get_many(keys)
+
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors:
+            pending.setdefault(key, text)
+
+    if pending:
+        try:
+            model = get_model()
+            encoded = model.encode(list(pending.values()), batch_size=batch_size)
+        except Exception:
+            # fallback dummy vectors (safe, never cached)
+            encoded = None
+
+        if encoded is None:
+            zero = np.zeros(384, dtype=np.float32)
+            vectors.update((key, zero) for key in pending)
+        else:
+            fresh = dict(zip(pending, encoded))
+            embedding_cache.put_many(fresh.items())
+            vectors.update(fresh)
+
+    return np.vstack([vectors[key] for key in keys]).astype(np.float32, copy=False)
+
+
+# =================================================
+# 🔹 MICRO-BATCHING EXECUTOR
+# =================================================
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent embed requests into one model.encode call.
+    - Waits at most max_wait_ms after the first queued text
+    - Encodes on a single worker thread, off the event loop
+    - While a batch encodes, new requests queue up for the next one
+    """
+
+    def __init__(
+        self,
+        max_batch: int = EMBED_MAX_BATCH,
+        max_wait_ms: float = EMBED_MAX_WAIT_MS
+    ):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="embed-batch"
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop = None
+        self._requests = 0
+        self._batches = 0
+        self._batch_sizes = Counter()
+        self._encoding = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            # fresh context: the worker outlives the request that started it
+            self._worker = loop.create_task(self._run(), context=contextvars.Context())
+
+    async def embed(self, text: str) -> np.ndarray:
+        # cache hits never touch the queue
+        cached = embedding_cache.get(cache_key(MODEL_NAME, text))
+        if cached is not None:
+            return cached
+
+        self._ensure_started()
+
+        future = self._loop.create_future()
+        self._queue.put_nowait((text, future))
+        self._requests += 1
+
+        return await future
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+
+            try:
+                batch.append(
+                    await asyncio.wait_for(self._queue.get(), remaining)
+                )
+            except asyncio.TimeoutError:
+                break
+
+        # callers that gave up (cancelled) don't cost a forward pass
+        return [(t, f) for t, f in batch if not f.done()]
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+
+            texts = [t for t, _ in batch]
+            self._batches += 1
+            self._batch_sizes[len(texts)] += 1
+            self._encoding = len(texts)
+
+            try:
+                with span("embed.batch", size=len(texts)):
+                    vectors = await self._loop.run_in_executor(
+                        self._executor, embed_texts, texts, len(texts)
+                    )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self._encoding = 0
+
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    def stats(self) -> dict:
+        total = sum(size * n for size, n in self._batch_sizes.items())
+
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "encoding": self._encoding,
+            "requests": self._requests,
+            "batches": self._batches,
+            "avg_batch_size": round(total / self._batches, 2) if self._batches else 0.0,
+            "max_batch_size": max(self._batch_sizes, default=0),
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000
+        }
+
+
+embedding_batcher = EmbeddingBatcher()
+
+
+async def aembed_text(text: str) -> np.ndarray:
+    """
+    Request-path embedding: shares forward passes with concurrent callers
+    """
+    with span("embed.query"):
+        return await embedding_batcher.embed(text)
@@ -0,0 +1,229 @@
+import os
+import difflib
+import hashlib
+from datetime import datetime
+from typing import List, Tuple
+
+from backend.database import analyzed_files_collection
+from backend.services.skill_engine import analyze_skill
+from backend.services.prompt_builder import diagnostic_lines
+from backend.services.llm_scheduler import INTERACTIVE
+
+# files shorter than this are always analyzed whole
+INCREMENTAL_MIN_LINES = int(os.getenv("INCREMENTAL_MIN_LINES", "80"))
+# above this share of changed lines a full analysis is cheaper to reason about
+INCREMENTAL_MAX_CHANGE = float(os.getenv("INCREMENTAL_MAX_CHANGE", "0.4"))
+INCREMENTAL_CONTEXT_LINES = int(os.getenv("INCREMENTAL_CONTEXT_LINES", "3"))
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------------
+# 🔍 DIFF
+# -------------------------------------------------
+def changed_lines(old: str, new: str) -> List[int]:
+    """
+    0-based line numbers of the new version that were inserted or
+    replaced; a pure deletion marks the line after it
+    """
+    old_lines, new_lines = old.splitlines(), new.splitlines()
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+
+    changed = []
+    for tag, _, _, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if j1 == j2:
+            changed.append(min(j1, len(new_lines) - 1))
+        else:
+            changed.extend(range(j1, j2))
+
+    return [n for n in changed if n >= 0]
+
+
+def hunks(lines: List[int], total: int, context: int = INCREMENTAL_CONTEXT_LINES) -> List[Tuple[int, int]]:
+    """
+    Merge line numbers into [start, end) ranges padded with context
+    """
+    ranges = []
+    for n in sorted(set(lines)):
+        start, end = max(0, n - context), min(total, n + context + 1)
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def excerpt(code: str, ranges: List[Tuple[int, int]]) -> str:
+    """
+    The hunks of a file with markers for the unchanged gaps
+    (line numbers are 1-based, as an editor shows them)
+    """
+    lines = code.splitlines()
+    out, cursor = [], 0
+
+    for start, end in ranges:
+        if start > cursor:
+            out.append(f"… lines {cursor + 1}-{start} unchanged …")
+        out.extend(lines[start:end])
+        cursor = end
+
+    if cursor < len(lines):
+        out.append(f"… lines {cursor + 1}-{len(lines)} unchanged …")
+
+    return "\n".join(out)
+
+
+def _merge(previous: dict, current: dict, sent: int, total: int) -> dict:
+    """
+    Findings for the changed hunks lead; earlier next steps for the
+    untouched code fill the remaining slots. An error flagged before
+    stays flagged, and confidence is weighted by the lines each covered.
+    The corrected code is only an excerpt with "unchanged" markers, so
+    it moves to corrected_excerpt and the result is marked partial.
+    """
+    steps = list(current.get("next_steps", []))
+    for step in previous.get("next_steps", []):
+        if len(steps) >= 3:
+            break
+        if step not in steps:
+            steps.append(step)
+
+    confidence = (
+        current.get("confidence_score", 50) * sent
+        + previous.get("confidence_score", 50) * (total - sent)
+    ) / max(1, total)
+
+    return {
+        **current,
+        "has_error": bool(current.get("has_error") or previous.get("has_error")),
+        "confidence_score": round(confidence),
+        "corrected_code": "",
+        "corrected_excerpt": current.get("corrected_code", ""),
+        "next_steps": steps,
+        "partial": True
+    }
+
+
+# -------------------------------------------------
+# 🧠 ANALYSIS
+# -------------------------------------------------
+async def analyze_file(
+    user_id: str,
+    file_path: str,
+    language: str,
+    code: str,
+    diagnostics: str = "",
+    priority: int = INTERACTIVE
+) -> dict:
+    """
+    Analyze a file against the last version this user submitted:
+    - Identical code and diagnostics → previous result, no LLM call
+    - Small edits to a large file → only the changed hunks (plus the
+      lines named in diagnostics) are sent, with the previous findings
+      as context; the result is marked partial and carries no
+      corrected_code (see _merge)
+    - Otherwise → full analysis
+    """
+
+    digest = code_hash(code)
+    previous = await analyzed_files_collection.find_one(
+        {"user_id": user_id, "file_path": file_path}
+    )
+
+    if (
+        previous
+        and previous["code_hash"] == digest
+        and previous.get("diagnostics", "") == diagnostics
+    ):
+        return {**previous["result"], "incremental": True, "reused": True}
+
+    total = len(code.splitlines())
+    ranges = None
+
+    if previous and previous.get("language") == language and total >= INCREMENTAL_MIN_LINES:
+        changed = changed_lines(previous["code"], code)
+        if len(changed) <= total * INCREMENTAL_MAX_CHANGE:
+            flagged = [n - 1 for n in diagnostic_lines(diagnostics) if n <= total]
+            ranges = hunks(changed + flagged, total)
+
+    if ranges:
+        prior = previous["result"]
+        context = (
+            f"Only the changed regions of {file_path} are shown; unchanged "
+            f"lines were analyzed before.\n"
+            f"Previous findings: {prior.get('simple_explanation', '')}\n"
+            f"{diagnostics}"
+        )
+
+        result = await analyze_skill(
+            language=language,
+            code=excerpt(code, ranges),
+            combined_context=context,
+            priority=priority
+        )
+        sent = sum(e - s for s, e in ranges)
+        print(f"🧩 Incremental analysis {file_path}: {sent}/{total} lines sent")
+
+        if prior.get("has_error") and not result.get("has_error"):
+            # the hunks look clean, but whether the earlier error is
+            # gone can only be told from the whole file
+            ranges = None
+        else:
+            result = _merge(prior, result, sent, total)
+
+    if not ranges:
+        result = await analyze_skill(
+            language=language,
+            code=code,
+            combined_context=diagnostics,
+            priority=priority
+        )
+        result["partial"] = False
+
+    await analyzed_files_collection.update_one(
+        {"user_id": user_id, "file_path": file_path},
+        {"$set": {
+            "language": language,
+            "code": code,
+            "code_hash": digest,
+            "diagnostics": diagnostics,
+            "result": result,
+            "updated_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+    return {**result, "incremental": bool(ranges), "reused": False}
+
+
+async def analyze_submission(
+    user_id: str,
+    language: str,
+    code: str,
+    diagnostics: str | None = None,
+    file_path: str | None = None,
+    priority: int = INTERACTIVE
+) -> dict:
+    """
+    Only the changed hunks are analyzed when the file is known
+    """
+    if file_path:
+        return await analyze_file(
+            user_id=user_id,
+            file_path=file_path,
+            language=language,
+            code=code,
+            diagnostics=diagnostics or "",
+            priority=priority
+        )
+
+    return await analyze_skill(
+        language=language,
+        code=code,
+        combined_context=diagnostics or "",
+        priority=priority
+    )
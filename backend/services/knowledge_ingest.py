@@ -1,47 +1,241 @@
+import os
+import json
+import codecs
+import asyncio
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List
+from typing import AsyncIterable, AsyncIterator, Iterable, List
+from pymongo.errors import BulkWriteError
 from backend.database import knowledge_collection
-from backend.services.embeddings import embed_text
+from backend.services.embeddings import embed_texts
+from backend.services.embedding_codec import encode_embedding
+from backend.services.chunker import achunk_stream, chunk_text  # chunk_text re-exported
+from backend.services.retrieval import index_documents
 
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", str(8 * 1024 * 1024)))
+DUPLICATE_KEY = 11000
 
-def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
-    chunks = []
-    start = 0
+# encoding runs here so a large document never blocks the event loop
+_ingest_executor = ThreadPoolExecutor(
+    max_workers=INGEST_WORKERS,
+    thread_name_prefix="ingest-embed"
+)
 
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        start += chunk_size - overlap
 
-    return chunks
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
 
-async def ingest_knowledge(skill: str, content: str, source: str = "manual"):
+# -------------------------------------------------
+# 📥 STREAM READERS
+# -------------------------------------------------
+def _parse_line(line: bytes) -> dict:
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError(f"expected a JSON object per line, got {type(record).__name__}")
+    return record
+
+
+async def iter_ndjson(body: AsyncIterable[bytes]) -> AsyncIterator[dict]:
     """
-    Store knowledge chunks with embeddings
+    Parse NDJSON from a byte stream without buffering the whole body.
+    Malformed lines and lines that are not objects raise ValueError.
     """
+    pending = b""
+
+    async for data in body:
+        pending += data
+        *lines, pending = pending.split(b"\n")
+
+        if len(pending) > INGEST_MAX_LINE_BYTES:
+            raise ValueError(f"NDJSON line exceeds {INGEST_MAX_LINE_BYTES} bytes")
+
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+
+    if pending.strip():
+        yield _parse_line(pending)
 
-    chunks = chunk_text(content)
-    documents = []
 
-    for idx, chunk in enumerate(chunks):
-        embedding = embed_text(chunk)
+async def iter_decoded(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
 
-        documents.append({
-            "skill": skill,
-            "content": chunk,
-            "embedding": embedding.tolist(),
-            "source": source,
-            "chunk_index": idx,
-            "created_at": datetime.utcnow()
-        })
+    async for data in chunks:
+        text = decoder.decode(data)
+        if text:
+            yield text
+
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def document_chunks(
+    skill: str,
+    pieces: AsyncIterable[str],
+    source: str = "manual"
+) -> AsyncIterator[dict]:
+    index = 0
+    async for chunk in achunk_stream(pieces):
+        yield {"skill": skill, "source": source, "content": chunk, "chunk_index": index}
+        index += 1
+
+
+async def ndjson_chunks(records: AsyncIterable[dict]) -> AsyncIterator[dict]:
+    """
+    {"skill", "content", "source"?} records → chunk records
+    """
+    async for record in records:
+        async def single():
+            yield record["content"]
+
+        async for chunk in document_chunks(
+            record["skill"],
+            single(),
+            record.get("source", "ndjson")
+        ):
+            yield chunk
+
+
+async def _from_iterable(items: Iterable[str]) -> AsyncIterator[str]:
+    for item in items:
+        yield item
+
+
+# -------------------------------------------------
+# 🧠 PIPELINED WRITER
+# -------------------------------------------------
+async def _next_batch(records: AsyncIterator[dict]) -> List[dict]:
+    batch = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= INGEST_BATCH_SIZE:
+            break
+    return batch
+
+
+async def _drop_duplicates(batch: List[dict]) -> List[dict]:
+    """
+    Hash each chunk and drop those already stored (or repeated in the batch)
+    """
+    unique = {}
+    for record in batch:
+        record["content_hash"] = content_hash(record["content"])
+        unique.setdefault(record["content_hash"], record)
+
+    cursor = knowledge_collection.find(
+        {"content_hash": {"$in": list(unique)}},
+        {"content_hash": 1}
+    )
+    async for doc in cursor:
+        unique.pop(doc["content_hash"], None)
+
+    return list(unique.values())
+
+
+async def _write_batch(documents: List[dict]) -> int:
+    """
+    Unordered insert; chunks that lost a dedup race are skipped
+    """
+    failed = set()
+
+    try:
+        await knowledge_collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY for err in errors):
+            raise
+        failed = {err["index"] for err in errors}
+
+    stored = [d for i, d in enumerate(documents) if i not in failed]
+
+    # insert_many fills in _id, so the chunks are searchable right away
+    index_documents(stored)
+
+    return len(stored)
+
+
+async def ingest_chunk_stream(records: AsyncIterable[dict]) -> dict:
+    """
+    Store chunk records ({skill, source, content, chunk_index}).
+    - Known content hashes are skipped before embedding
+    - Up to INGEST_WORKERS batches encode on worker threads while
+      the previous batch is written with an unordered insert_many
+    - Records are pulled only when a batch slot frees up, so a slow
+      writer throttles the reader (backpressure)
+    Not transactional: if the stream fails part-way (e.g. a bad NDJSON
+    line), batches already written stay stored; re-sending the whole
+    stream is safe, as stored chunks are skipped by content hash.
+    """
+
+    loop = asyncio.get_running_loop()
+    records = aiter(records)
+    in_flight = deque()
+    received = 0
+    stored = 0
+
+    async def submit_next() -> bool:
+        nonlocal received
+        batch = await _next_batch(records)
+        if not batch:
+            return False
+
+        received += len(batch)
+        batch = await _drop_duplicates(batch)
+        texts = [r["content"] for r in batch]
+
+        future = loop.run_in_executor(_ingest_executor, embed_texts, texts)
+        in_flight.append((batch, future))
+        return True
+
+    while len(in_flight) < INGEST_WORKERS and await submit_next():
+        pass
+
+    while in_flight:
+        batch, future = in_flight.popleft()
+        embeddings = await future
+
+        # keep the encoders busy while this batch is written
+        await submit_next()
+
+        if not batch:
+            continue
+
+        now = datetime.utcnow()
+        documents = [
+            {
+                **record,
+                **encode_embedding(embedding),
+                "created_at": now
+            }
+            for record, embedding in zip(batch, embeddings)
+        ]
+
+        stored += await _write_batch(documents)
+
+    return {
+        "chunks_received": received,
+        "chunks_added": stored,
+        "duplicates_skipped": received - stored
+    }
+
+
+async def ingest_knowledge(skill: str, content: str, source: str = "manual"):
+    """
+    Store knowledge chunks with embeddings
+    """
 
-    if documents:
-        await knowledge_collection.insert_many(documents)
+    result = await ingest_chunk_stream(
+        document_chunks(skill, _from_iterable([content]), source)
+    )
 
     return {
         "skill": skill,
-        "chunks_added": len(documents)
+        "chunks_added": result["chunks_added"],
+        "duplicates_skipped": result["duplicates_skipped"]
     }
@@ -0,0 +1,343 @@
+import re
+import json
+import math
+import hashlib
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.services.vector_index import partition_key, top_k_indices
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# identifiers keep dots (os.path.join) so pasted API names match exactly
+_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased terms. Compound identifiers are kept whole and also
+    split into parts: ZeroDivisionError → zerodivisionerror, zero,
+    division, error.
+    """
+    terms = []
+
+    for match in _TOKEN_RE.finditer(text):
+        token = match.group()
+        terms.append(token.lower())
+
+        parts = [
+            p.lower()
+            for piece in re.split(r"[._]", token)
+            for p in _CAMEL_RE.findall(piece)
+        ]
+        if len(parts) > 1:
+            terms.extend(parts)
+
+    return terms
+
+
+def term_hash(term: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+class LexicalSegment:
+    """
+    Frozen BM25 postings in CSR form, saved next to the ANN snapshot and
+    memory-mapped, so workers do not re-tokenize the snapshot at startup.
+    Terms are found by binary search over their 64-bit hashes; the term
+    bytes are kept to rule out collisions.
+    """
+
+    def __init__(
+        self,
+        term_hashes: np.ndarray,
+        term_offsets: np.ndarray,
+        term_blob: np.ndarray,
+        post_offsets: np.ndarray,
+        post_docs: np.ndarray,
+        post_tfs: np.ndarray,
+        lengths: np.ndarray,
+        skill_codes: np.ndarray,
+        doc_ids: np.ndarray,
+        meta: dict
+    ):
+        self.term_hashes = term_hashes
+        self.term_offsets = term_offsets
+        self.term_blob = term_blob
+        self.post_offsets = post_offsets
+        self.post_docs = post_docs
+        self.post_tfs = post_tfs
+        self.lengths = lengths
+        self.skill_codes = skill_codes
+        self.doc_ids = doc_ids
+        self.meta = meta
+        self.total_length = meta["total_length"]
+        self._skill_index = {
+            name: code for code, name in enumerate(meta.get("skills", []))
+        }
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        h = np.uint64(term_hash(term))
+        encoded = term.encode("utf-8")
+
+        i = int(np.searchsorted(self.term_hashes, h))
+        while i < len(self.term_hashes) and self.term_hashes[i] == h:
+            start, end = self.term_offsets[i], self.term_offsets[i + 1]
+            if bytes(self.term_blob[start:end]) == encoded:
+                lo, hi = self.post_offsets[i], self.post_offsets[i + 1]
+                return self.post_docs[lo:hi], self.post_tfs[lo:hi]
+            i += 1
+
+        return None
+
+    def skill_mask(self, skills: Iterable[str]) -> np.ndarray:
+        codes = [self._skill_index[s] for s in skills if s in self._skill_index]
+        return np.isin(self.skill_codes, codes)
+
+    def doc_id(self, position: int) -> str:
+        return self.doc_ids[position].decode()
+
+
+class BM25Index:
+    """
+    In-process inverted index with Okapi BM25 scoring.
+    Postings are append-only int arrays, so adding chunks is cheap
+    and scoring a term is a vectorized scatter-add. An optional frozen
+    base segment (the snapshot's postings) is scored as positions
+    0..len(base) ahead of the appended chunks.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.base: Optional[LexicalSegment] = None
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._lengths = array("f")
+        self._skills = array("i")
+        self._skill_codes: Dict[str, int] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_ids) + (len(self.base) if self.base is not None else 0)
+
+    def add(self, docs: Iterable[dict]) -> int:
+        """
+        Index {_id, content, skill?} documents, skipping known ids
+        """
+        added = 0
+
+        with self._lock:
+            for doc in docs:
+                doc_id = str(doc["_id"])
+                if doc_id in self._positions:
+                    continue
+
+                terms = tokenize(doc["content"])
+                position = len(self._doc_ids)
+
+                self._positions[doc_id] = position
+                self._doc_ids.append(doc_id)
+                self._lengths.append(len(terms))
+                self._total_length += len(terms)
+
+                skill = partition_key(doc.get("skill"))
+                code = self._skill_codes.setdefault(skill, len(self._skill_codes))
+                self._skills.append(code)
+
+                counts = {}
+                for term in terms:
+                    counts[term] = counts.get(term, 0) + 1
+
+                for term, tf in counts.items():
+                    docs_arr, tfs_arr = self._postings.setdefault(
+                        term, (array("i"), array("i"))
+                    )
+                    docs_arr.append(position)
+                    tfs_arr.append(tf)
+
+                added += 1
+
+        return added
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        skills: Optional[Iterable[str]] = None
+    ) -> List[Tuple[float, str]]:
+        """
+        (bm25 score, doc_id) pairs, best first; only docs matching
+        at least one query term are returned
+        """
+        base = self.base
+        base_size = len(base) if base is not None else 0
+        fresh_size = len(self._doc_ids)
+        size = base_size + fresh_size
+
+        if size == 0:
+            return []
+
+        # (positions, tfs, lengths) per segment that holds the term
+        matches = []
+        fresh_lengths = np.frombuffer(self._lengths, dtype=np.float32)[:fresh_size]
+
+        for term in set(tokenize(query)):
+            parts = []
+            if base is not None:
+                found = base.postings(term)
+                if found is not None and len(found[0]):
+                    parts.append((found[0], found[1], base.lengths, 0))
+            if term in self._postings:
+                docs_arr, tfs_arr = self._postings[term]
+                parts.append((
+                    np.frombuffer(docs_arr, dtype=np.int32),
+                    np.frombuffer(tfs_arr, dtype=np.int32),
+                    fresh_lengths,
+                    base_size
+                ))
+            if parts:
+                matches.append(parts)
+
+        if not matches:
+            return []
+
+        total_length = self._total_length + (base.total_length if base is not None else 0)
+        avg_length = total_length / size
+        scores = np.zeros(size, dtype=np.float32)
+
+        for parts in matches:
+            df = sum(len(docs) for docs, *_ in parts)
+            idf = math.log(1 + (size - df + 0.5) / (df + 0.5))
+
+            for docs, tfs, lengths, shift in parts:
+                tfs = tfs.astype(np.float32)
+                norm = self.k1 * (1 - self.b + self.b * lengths[docs] / avg_length)
+                scores[docs + shift] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        if skills is not None:
+            skills = list(skills)
+            codes = [self._skill_codes[s] for s in skills if s in self._skill_codes]
+            doc_skills = np.frombuffer(self._skills, dtype=np.int32)[:fresh_size]
+            scores[base_size:][~np.isin(doc_skills, codes)] = 0
+            if base is not None:
+                scores[:base_size][~base.skill_mask(skills)] = 0
+
+        best = top_k_indices(scores, min(top_k, int(np.count_nonzero(scores))))
+
+        return [(float(scores[i]), self._doc_id(int(i), base_size)) for i in best]
+
+    def _doc_id(self, position: int, base_size: int) -> str:
+        if position < base_size:
+            return self.base.doc_id(position)
+        return self._doc_ids[position - base_size]
+
+    def freeze(self) -> LexicalSegment:
+        """
+        The appended chunks as a LexicalSegment (for the ANN build)
+        """
+        with self._lock:
+            terms = sorted(self._postings, key=term_hash)
+            encoded = [t.encode("utf-8") for t in terms]
+
+            term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            term_offsets[1:] = np.cumsum([len(t) for t in encoded])
+
+            post_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            post_offsets[1:] = np.cumsum([len(self._postings[t][0]) for t in terms])
+
+            skill_names = [None] * len(self._skill_codes)
+            for name, code in self._skill_codes.items():
+                skill_names[code] = name
+
+            return LexicalSegment(
+                term_hashes=np.array([term_hash(t) for t in terms], dtype=np.uint64),
+                term_offsets=term_offsets,
+                term_blob=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                post_offsets=post_offsets,
+                post_docs=np.concatenate(
+                    [np.frombuffer(self._postings[t][0], dtype=np.int32) for t in terms]
+                ) if terms else np.empty(0, dtype=np.int32),
+                post_tfs=np.concatenate(
+                    [np.frombuffer(self._postings[t][1], dtype=np.int32) for t in terms]
+                ) if terms else np.empty(0, dtype=np.int32),
+                lengths=np.array(self._lengths, dtype=np.float32),
+                skill_codes=np.array(self._skills, dtype=np.int32),
+                doc_ids=np.array([d.encode() for d in self._doc_ids]),
+                meta={"total_length": self._total_length, "skills": skill_names}
+            )
+
+
+# =================================================
+# 🔹 ON-DISK FORMAT (mmap, inside the ANN snapshot dir)
+# =================================================
+
+_SEGMENT_ARRAYS = (
+    "term_hashes", "term_offsets", "post_offsets", "post_docs",
+    "post_tfs", "lengths", "skill_codes", "doc_ids"
+)
+
+
+def save_segment(segment: LexicalSegment, path: Path):
+    path = Path(path)
+    for name in _SEGMENT_ARRAYS:
+        np.save(path / f"bm25_{name}.npy", np.ascontiguousarray(getattr(segment, name)))
+    (path / "bm25_terms.bin").write_bytes(segment.term_blob.tobytes())
+    (path / "bm25_meta.json").write_text(json.dumps(segment.meta))
+
+
+def open_segment(path: Path) -> Optional[LexicalSegment]:
+    """
+    Memory-map saved postings, or None when the snapshot has none
+    """
+    path = Path(path)
+    if not (path / "bm25_meta.json").exists():
+        return None
+
+    arrays = {
+        name: np.load(path / f"bm25_{name}.npy", mmap_mode="r")
+        for name in _SEGMENT_ARRAYS
+    }
+
+    blob_path = path / "bm25_terms.bin"
+    term_blob = (
+        np.memmap(blob_path, dtype=np.uint8, mode="r")
+        if blob_path.stat().st_size else np.empty(0, dtype=np.uint8)
+    )
+
+    return LexicalSegment(
+        term_blob=term_blob,
+        meta=json.loads((path / "bm25_meta.json").read_text()),
+        **arrays
+    )
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[List[str]],
+    k: int = 60
+) -> List[Tuple[float, str]]:
+    """
+    Fuse ranked doc-id lists: score = Σ 1 / (k + rank)
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+
+    return sorted(
+        ((score, doc_id) for doc_id, score in fused.items()),
+        reverse=True
+    )
@@ -0,0 +1,141 @@
+import os
+import json
+import random
+import asyncio
+from typing import AsyncIterator, Optional
+
+import httpx
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+# =================================================
+# 🔹 SHARED CONNECTION POOL
+# =================================================
+
+def get_client() -> httpx.AsyncClient:
+    """
+    One pooled keep-alive client per process, so concurrent LLM calls
+    share TCP/TLS connections (multiplexed over HTTP/2 when available)
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                keepalive_expiry=60
+            ),
+            headers={"Content-Type": "application/json"}
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# =================================================
+# 🔹 RETRIES
+# =================================================
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Exponential backoff with full jitter
+    """
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def is_retryable(status_code: int) -> bool:
+    return 500 <= status_code < 600
+
+
+async def post_json(
+    url: str,
+    payload: dict,
+    timeout: Optional[float] = None,
+    retries: int = LLM_MAX_RETRIES
+) -> Optional[httpx.Response]:
+    """
+    POST with async backoff on 5xx / timeouts / dropped connections.
+    Returns the last response, or None if no response was received.
+    """
+    client = get_client()
+    request_timeout = httpx.Timeout(
+        timeout or LLM_TIMEOUT,
+        connect=LLM_CONNECT_TIMEOUT
+    )
+
+    for attempt in range(retries + 1):
+        try:
+            response = await client.post(url, json=payload, timeout=request_timeout)
+        except (httpx.TimeoutException, httpx.TransportError):
+            if attempt < retries:
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            return None
+
+        if is_retryable(response.status_code) and attempt < retries:
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+
+        return response
+
+    return None
+
+
+# =================================================
+# 🔹 STREAMING (server-sent events)
+# =================================================
+
+async def stream_sse(
+    url: str,
+    payload: dict,
+    timeout: Optional[float] = None
+) -> AsyncIterator[dict]:
+    """
+    POST and yield each JSON `data:` event as it arrives.
+    Nothing is retried once bytes have been forwarded; closing the
+    generator early closes the upstream connection.
+    """
+    client = get_client()
+    request_timeout = httpx.Timeout(
+        timeout or LLM_TIMEOUT,
+        connect=LLM_CONNECT_TIMEOUT
+    )
+
+    try:
+        async with client.stream("POST", url, json=payload, timeout=request_timeout) as response:
+            if response.status_code != 200:
+                return
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if not data or data == "[DONE]":
+                    continue
+                try:
+                    yield json.loads(data)
+                except ValueError:
+                    continue
+    except (httpx.TimeoutException, httpx.TransportError) as e:
+        print("⚠️ LLM stream interrupted:", e)
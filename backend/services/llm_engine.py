@@ -1,10 +1,19 @@
-import os
-import json
 import re
-import time
-import requests
-from typing import Optional
+import asyncio
+import hashlib
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from dotenv import load_dotenv
+from pydantic import ValidationError
+
+from backend.models import CodeAnalysis
+
+from backend.services.analysis_cache import analysis_cache, analysis_key
+from backend.services.llm_scheduler import INTERACTIVE
+from backend.services.llm_providers import llm_provider
+from backend.services.prompt_builder import build_analysis_prompt, build_answer_prompt
+from backend.services.llm_json import extract_json_object
+from backend.services.tracing import span
 
 # =================================================
 # 🔐 LOAD ENVIRONMENT
@@ -12,128 +21,59 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-MODEL_NAME = "gemini-2.5-flash"
-BASE_URL = "https://generativelanguage.googleapis.com/v1/models/"
-HEADERS = {"Content-Type": "application/json"}
 TIMEOUT = 30
-MAX_RETRIES = 2
+MAX_ANSWER_LINES = 6
 
 
 # =================================================
-# 🔹 SAFE JSON FALLBACK
+# 🔹 SINGLE-FLIGHT
 # =================================================
 
-def _safe_json(message: str) -> str:
-    return json.dumps({
-        "has_error": False,
-        "confidence_score": 50,
-        "simple_explanation": message,
-        "corrected_code": "",
-        "next_steps": []
-    })
-
-
-# =================================================
-# 🔹 GEMINI REQUEST HANDLER
-# =================================================
-
-def _make_gemini_request(prompt: str) -> Optional[str]:
-
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        return None
-
-    url = f"{BASE_URL}{MODEL_NAME}:generateContent?key={api_key}"
+class SingleFlight:
+    """
+    Concurrent callers with the same key share one in-flight call.
+    The call runs as its own task, so a caller that disconnects
+    does not cancel it for the others.
+    """
 
-    payload = {
-        "contents": [
-            {"parts": [{"text": prompt}]}
-        ]
-    }
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
 
-    for attempt in range(MAX_RETRIES + 1):
-        try:
-            response = requests.post(
-                url,
-                headers=HEADERS,
-                json=payload,
-                timeout=TIMEOUT
-            )
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        task = self._calls.get(key)
 
-            if response.status_code == 200:
-                data = response.json()
-                candidates = data.get("candidates", [])
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.calls += 1
+        else:
+            self.shared += 1
 
-                if not candidates:
-                    return None
+        return await asyncio.shield(task)
 
-                content = candidates[0].get("content", {})
-                parts = content.get("parts", [])
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.calls,
+            "coalesced": self.shared
+        }
 
-                if not parts:
-                    return None
 
-                return parts[0].get("text")
+llm_flight = SingleFlight()
 
-            if 500 <= response.status_code < 600:
-                if attempt < MAX_RETRIES:
-                    time.sleep(2)
-                    continue
-
-            return None
-
-        except requests.Timeout:
-            if attempt < MAX_RETRIES:
-                time.sleep(2)
-                continue
-            return None
-
-        except requests.RequestException:
-            return None
 
-    return None
-
-
-# =================================================
-# 🔹 JSON CLEANER
-# =================================================
-
-def _extract_valid_json(raw_text: str) -> Optional[dict]:
-
-    if not raw_text:
-        return None
-
-    cleaned = raw_text.strip()
-
-    if cleaned.startswith("```"):
-        cleaned = re.sub(r"```json|```", "", cleaned).strip()
-
-    try:
-        return json.loads(cleaned)
-    except json.JSONDecodeError:
-        pass
-
-    match = re.search(r"\{[\s\S]*\}", cleaned)
-    if match:
-        try:
-            return json.loads(match.group())
-        except json.JSONDecodeError:
-            pass
-
-    return None
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
 
 
 # =================================================
 # 🔹 MAIN ANALYSIS
 # =================================================
 
-def analyze_code_with_llm(
-    language: str,
-    code: str,
-    combined_context: str = ""
-) -> str:
-
-    prompt = f"""
+ANALYSIS_PROMPT = """
 You are a VS Code AI coding assistant.
 
 STRICT RULES:
@@ -161,30 +101,172 @@ Code ({language}):
 {code}
 """
 
-    raw_output = _make_gemini_request(prompt)
+# any edit to the template (or model) changes the version, so cached
+# analyses produced by the old prompt are never served
+PROMPT_VERSION = hashlib.sha256(
+    f"{llm_provider.name}:{llm_provider.model}\n{ANALYSIS_PROMPT}".encode("utf-8")
+).hexdigest()[:12]
+
+
+async def analyze_code_with_llm(
+    language: str,
+    code: str,
+    combined_context: str = "",
+    timeout: float = TIMEOUT,
+    priority: int = INTERACTIVE
+) -> CodeAnalysis:
+
+    key = analysis_key(language, code, combined_context, PROMPT_VERSION)
+    with span("analysis_cache.get"):
+        cached = await analysis_cache.get(key)
+    if cached is not None:
+        return CodeAnalysis(**cached)
+
+    prompt = build_analysis_prompt(
+        ANALYSIS_PROMPT,
+        language=language,
+        code=code,
+        combined_context=combined_context
+    )
+
+    # identical prompts already on their way to Gemini share that call
+    return await llm_flight.do(
+        "analyze:" + prompt_key(prompt),
+        lambda: _analyze_uncached(key, prompt, timeout, priority)
+    )
+
+
+async def _analyze_uncached(key: str, prompt: str, timeout: float, priority: int) -> CodeAnalysis:
+
+    with span("llm.generate", endpoint="analyze", provider=llm_provider.name):
+        raw_output = await llm_provider.generate(prompt, timeout=timeout, priority=priority)
+
+    return await _finish_analysis(key, raw_output)
+
+
+async def _finish_analysis(key: str, raw_output: Optional[str]) -> CodeAnalysis:
+    """
+    One parse of the reply straight into the typed result
+    """
 
     if not raw_output:
-        return _safe_json("AI response unavailable.")
+        return CodeAnalysis.fallback("AI response unavailable.")
 
-    parsed_json = _extract_valid_json(raw_output)
+    parsed_json = extract_json_object(raw_output)
 
     if not parsed_json:
-        return _safe_json("AI response parsing failed.")
+        return CodeAnalysis.fallback("AI response parsing failed.")
+
+    try:
+        result = CodeAnalysis(**parsed_json)
+    except ValidationError:
+        return CodeAnalysis.fallback("AI response parsing failed.")
+
+    # only real answers are cached; failures are retried next time
+    await analysis_cache.put(key, result.model_dump())
+
+    return result
+
+
+class _JsonStringField:
+    """
+    Incrementally decodes one string field ("simple_explanation") out of
+    a JSON object that is still being generated
+    """
+
+    _ESCAPES = {"n": "\n", "t": "\t", "r": "", "b": "", "f": "", '"': '"', "\\": "\\", "/": "/"}
+
+    def __init__(self, field: str):
+        self._start = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ""
+        self._inside = False
+        self.done = False
+
+    def feed(self, text: str) -> str:
+        if self.done:
+            return ""
+
+        self._buffer += text
+
+        if not self._inside:
+            match = self._start.search(self._buffer)
+            if not match:
+                return ""
+            self._buffer = self._buffer[match.end():]
+            self._inside = True
+
+        out = []
+        i = 0
+        while i < len(self._buffer):
+            ch = self._buffer[i]
+            if ch == '"':
+                self.done = True
+                break
+            if ch == "\\":
+                if i + 1 >= len(self._buffer):
+                    break
+                code = self._buffer[i + 1]
+                if code == "u":
+                    if i + 6 > len(self._buffer):
+                        break
+                    try:
+                        out.append(chr(int(self._buffer[i + 2:i + 6], 16)))
+                    except ValueError:
+                        pass
+                    i += 6
+                    continue
+                out.append(self._ESCAPES.get(code, code))
+                i += 2
+                continue
+            out.append(ch)
+            i += 1
 
-    # ✅ LIMIT NEXT STEPS TO 3 (ONLY NEW LOGIC ADDED)
-    if "next_steps" in parsed_json and isinstance(parsed_json["next_steps"], list):
-        parsed_json["next_steps"] = parsed_json["next_steps"][:3]
+        self._buffer = self._buffer[i:]
+        return "".join(out)
 
-    return json.dumps(parsed_json)
+
+async def stream_code_analysis(
+    language: str,
+    code: str,
+    combined_context: str = "",
+    timeout: float = TIMEOUT,
+    priority: int = INTERACTIVE
+) -> AsyncIterator[Tuple[str, Union[str, CodeAnalysis]]]:
+    """
+    ("delta", explanation text) events while Gemini writes the
+    explanation, then one ("result", CodeAnalysis) event
+    """
+
+    key = analysis_key(language, code, combined_context, PROMPT_VERSION)
+    cached = await analysis_cache.get(key)
+    if cached is not None:
+        yield "result", CodeAnalysis(**cached)
+        return
+
+    prompt = build_analysis_prompt(
+        ANALYSIS_PROMPT,
+        language=language,
+        code=code,
+        combined_context=combined_context
+    )
+
+    explanation = _JsonStringField("simple_explanation")
+    pieces = []
+
+    async for piece in llm_provider.stream(prompt, timeout=timeout, priority=priority):
+        pieces.append(piece)
+        delta = explanation.feed(piece)
+        if delta:
+            yield "delta", delta
+
+    yield "result", await _finish_analysis(key, "".join(pieces))
 
 
 # =================================================
 # 🔹 CHAT MODE
 # =================================================
 
-def generate_answer(question: str, context: str) -> str:
-
-    prompt = f"""
+ANSWER_PROMPT = """
 You are a VS Code coding assistant.
 
 Rules:
@@ -201,7 +283,26 @@ User Question:
 {question}
 """
 
-    raw_output = _make_gemini_request(prompt)
+
+async def generate_answer(
+    question: str,
+    context: Union[str, List[str]],
+    timeout: float = TIMEOUT,
+    priority: int = INTERACTIVE
+) -> str:
+
+    prompt = build_answer_prompt(ANSWER_PROMPT, question, context)
+
+    return await llm_flight.do(
+        "answer:" + prompt_key(prompt),
+        lambda: _answer_uncached(prompt, timeout, priority)
+    )
+
+
+async def _answer_uncached(prompt: str, timeout: float, priority: int) -> str:
+
+    with span("llm.generate", endpoint="answer", provider=llm_provider.name):
+        raw_output = await llm_provider.generate(prompt, timeout=timeout, priority=priority)
 
     if not raw_output:
         return "AI temporarily unavailable."
@@ -210,6 +311,55 @@ User Question:
 
     # 🔥 Force maximum 6 lines
     lines = cleaned.splitlines()
-    shortened = "\n".join(lines[:6])
+    shortened = "\n".join(lines[:MAX_ANSWER_LINES])
+
+    return shortened
+
+
+async def stream_answer(
+    question: str,
+    context: Union[str, List[str]],
+    timeout: float = TIMEOUT,
+    priority: int = INTERACTIVE
+) -> AsyncIterator[str]:
+    """
+    Streaming generate_answer: text is forwarded as it arrives and the
+    upstream stream is dropped as soon as the line limit is reached
+    """
+
+    prompt = build_answer_prompt(ANSWER_PROMPT, question, context)
+
+    lines = 0
+    started = False
+    pending = ""  # trailing newlines are held until more text follows
+
+    pieces = llm_provider.stream(prompt, timeout=timeout, priority=priority)
+
+    async with aclosing(pieces):
+        async for piece in pieces:
+            if not started:
+                piece = piece.lstrip()
+                if not piece:
+                    continue
+                started = True
+
+            text = pending + piece
+            body = text.rstrip("\n")
+            pending = text[len(body):]
+
+            out = []
+            for segment in re.split(r"(\r?\n)", body):
+                if segment.endswith("\n"):
+                    lines += 1
+                    if lines >= MAX_ANSWER_LINES:
+                        break
+                out.append(segment)
+
+            if out:
+                yield "".join(out)
+
+            if lines >= MAX_ANSWER_LINES:
+                return
 
-    return shortened
\ No newline at end of file
+    if not started:
+        yield "AI temporarily unavailable."
\ No newline at end of file
@@ -0,0 +1,65 @@
+import json
+from typing import Optional
+
+try:
+    import orjson
+
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    JSON_ERRORS = (orjson.JSONDecodeError, ValueError)
+except ImportError:
+    loads = json.loads
+    dumps = json.dumps
+    JSON_ERRORS = (ValueError,)
+
+
+_decoder = json.JSONDecoder()
+
+
+def _strip_fences(text: str) -> str:
+    """
+    Drop an opening ```json line and a closing ``` around the reply
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        newline = text.find("\n")
+        text = text[newline + 1:] if newline != -1 else ""
+    if text.endswith("```"):
+        text = text[:-3]
+    return text
+
+
+def extract_json_object(text: str) -> Optional[dict]:
+    """
+    First parseable {...} object in an LLM reply, ignoring code fences
+    and surrounding prose. A clean reply is one loads() call; otherwise
+    each "{" is tried with raw_decode, which stops at the end of the
+    object, so trailing prose does not matter. Both parse in C.
+    """
+    if not text:
+        return None
+
+    text = _strip_fences(text)
+
+    try:
+        value = loads(text)
+        if isinstance(value, dict):
+            return value
+    except JSON_ERRORS:
+        pass
+
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+            if isinstance(value, dict):
+                return value
+        except (ValueError, RecursionError):
+            pass
+        start = text.find("{", start + 1)
+
+    return None
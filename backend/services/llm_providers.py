@@ -0,0 +1,303 @@
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import math
+import hashlib
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List, Optional
+
+from backend.services.llm_client import post_json, stream_sse
+from backend.services.llm_scheduler import llm_scheduler, DeadlineExceeded, INTERACTIVE
+
+# "gemini" | "fake"
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1/models/"
+TIMEOUT = 30
+
+# fake provider: "fixed:MS" | "uniform:LO_MS,HI_MS" | "lognormal:MEDIAN_MS,SIGMA"
+LLM_FAKE_LATENCY = os.getenv("LLM_FAKE_LATENCY", "lognormal:800,0.5")
+LLM_FAKE_FIRST_TOKEN_MS = float(os.getenv("LLM_FAKE_FIRST_TOKEN_MS", "150"))
+LLM_FAKE_ERROR_RATE = float(os.getenv("LLM_FAKE_ERROR_RATE", "0"))
+LLM_FAKE_SEED = os.getenv("LLM_FAKE_SEED")
+LLM_FAKE_RESPONSES = os.getenv("LLM_FAKE_RESPONSES")  # optional JSON file
+
+
+class LLMProvider(ABC):
+    """
+    What llm_engine needs from a model backend: one completion,
+    or the same completion as a stream of text pieces
+    """
+
+    name = "base"
+    model = ""
+
+    @abstractmethod
+    async def generate(
+        self,
+        prompt: str,
+        timeout: float = TIMEOUT,
+        priority: int = INTERACTIVE
+    ) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def stream(
+        self,
+        prompt: str,
+        timeout: float = TIMEOUT,
+        priority: int = INTERACTIVE
+    ) -> AsyncIterator[str]:
+        ...
+
+
+# =================================================
+# 🔹 GEMINI
+# =================================================
+
+class GeminiProvider(LLMProvider):
+
+    name = "gemini"
+
+    def __init__(self, model: str = GEMINI_MODEL):
+        self.model = model
+
+    async def generate(
+        self,
+        prompt: str,
+        timeout: float = TIMEOUT,
+        priority: int = INTERACTIVE
+    ) -> Optional[str]:
+
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            return None
+
+        url = f"{GEMINI_BASE_URL}{self.model}:generateContent?key={api_key}"
+
+        payload = {
+            "contents": [
+                {"parts": [{"text": prompt}]}
+            ]
+        }
+
+        # the scheduler queues by priority, adapts concurrency to 429/5xx
+        # and owns retries; each attempt is one pooled async POST
+        response = await llm_scheduler.call(
+            lambda remaining: post_json(url, payload, timeout=remaining, retries=0),
+            priority=priority,
+            timeout=timeout
+        )
+
+        if response is None or response.status_code != 200:
+            return None
+
+        try:
+            data = response.json()
+        except ValueError:
+            return None
+
+        candidates = data.get("candidates", [])
+
+        if not candidates:
+            return None
+
+        content = candidates[0].get("content", {})
+        parts = content.get("parts", [])
+
+        if not parts:
+            return None
+
+        return parts[0].get("text")
+
+    async def stream(
+        self,
+        prompt: str,
+        timeout: float = TIMEOUT,
+        priority: int = INTERACTIVE
+    ) -> AsyncIterator[str]:
+        """
+        Text pieces from streamGenerateContent as Gemini produces them
+        """
+
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            return
+
+        url = f"{GEMINI_BASE_URL}{self.model}:streamGenerateContent?alt=sse&key={api_key}"
+
+        payload = {
+            "contents": [
+                {"parts": [{"text": prompt}]}
+            ]
+        }
+
+        deadline = time.monotonic() + timeout
+
+        try:
+            # the slot is held for the whole stream
+            async with llm_scheduler.slot(priority, deadline) as outcome:
+                events = stream_sse(url, payload, timeout=timeout)
+                try:
+                    async for data in events:
+                        outcome["status"] = 200
+                        for candidate in data.get("candidates", [])[:1]:
+                            for part in candidate.get("content", {}).get("parts", []):
+                                if part.get("text"):
+                                    yield part["text"]
+                finally:
+                    # leaving early (line limit, client gone) closes the upstream stream
+                    await events.aclose()
+        except DeadlineExceeded:
+            return
+
+
+# =================================================
+# 🔹 FAKE (offline load testing)
+# =================================================
+
+FAKE_ANALYSES = [
+    {
+        "has_error": True,
+        "confidence_score": 62,
+        "simple_explanation": "The variable is used before it is assigned.\nMove the assignment above the first use.",
+        "corrected_code": "total = 0\nfor x in items:\n    total += x",
+        "next_steps": ["Initialize variables first", "Read about scope", "Add a test"]
+    },
+    {
+        "has_error": False,
+        "confidence_score": 85,
+        "simple_explanation": "The code runs correctly.\nNames are clear and the logic is simple.",
+        "corrected_code": "",
+        "next_steps": ["Add type hints", "Handle empty input"]
+    }
+]
+
+FAKE_ANSWERS = [
+    "Use a dictionary when you need fast lookups by key.\n"
+    "Lists keep order and allow duplicates.\n"
+    "Sets drop duplicates and test membership quickly.\n"
+    "Pick the structure that matches how you read the data.",
+    "Wrap the risky call in try/except.\n"
+    "Catch the narrowest exception you expect.\n"
+    "Log or re-raise anything you cannot handle."
+]
+
+
+def parse_latency(spec: str):
+    """
+    "lognormal:800,0.5" → function(rng) returning seconds
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        median, sigma = values[0], values[1] if len(values) > 1 else 0.5
+        return lambda rng: rng.lognormvariate(math.log(median), sigma) / 1000
+
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class FakeProvider(LLMProvider):
+    """
+    Deterministic stand-in for load tests and benchmarks: no network,
+    no quota. The response depends only on the prompt; latency is drawn
+    from the configured distribution. Calls still go through the
+    scheduler so its overhead is part of what gets measured.
+    """
+
+    name = "fake"
+    model = "fake"
+
+    def __init__(
+        self,
+        latency: str = LLM_FAKE_LATENCY,
+        first_token_ms: float = LLM_FAKE_FIRST_TOKEN_MS,
+        error_rate: float = LLM_FAKE_ERROR_RATE,
+        seed: Optional[str] = LLM_FAKE_SEED,
+        responses_path: Optional[str] = LLM_FAKE_RESPONSES
+    ):
+        self.latency = parse_latency(latency)
+        self.first_token = first_token_ms / 1000
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.analyses: List[dict] = FAKE_ANALYSES
+        self.answers: List[str] = FAKE_ANSWERS
+
+        if responses_path:
+            with open(responses_path, encoding="utf-8") as f:
+                canned = json.load(f)
+            self.analyses = canned.get("analysis", self.analyses)
+            self.answers = canned.get("answer", self.answers)
+
+    def respond(self, prompt: str) -> str:
+        pick = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+
+        # analysis prompts ask for the JSON schema, chat prompts do not
+        if '"simple_explanation"' in prompt:
+            return json.dumps(self.analyses[pick % len(self.analyses)])
+        return self.answers[pick % len(self.answers)]
+
+    async def generate(
+        self,
+        prompt: str,
+        timeout: float = TIMEOUT,
+        priority: int = INTERACTIVE
+    ) -> Optional[str]:
+
+        try:
+            async with llm_scheduler.slot(priority, time.monotonic() + timeout) as outcome:
+                await asyncio.sleep(min(self.latency(self.rng), timeout))
+                if self.rng.random() < self.error_rate:
+                    outcome["status"] = 503
+                    return None
+                outcome["status"] = 200
+        except DeadlineExceeded:
+            return None
+
+        return self.respond(prompt)
+
+    async def stream(
+        self,
+        prompt: str,
+        timeout: float = TIMEOUT,
+        priority: int = INTERACTIVE
+    ) -> AsyncIterator[str]:
+
+        text = self.respond(prompt)
+        pieces = re.findall(r"\S+\s*|\s+", text)
+        total = self.latency(self.rng)
+        step = max(0.0, total - self.first_token) / max(1, len(pieces))
+
+        try:
+            async with llm_scheduler.slot(priority, time.monotonic() + timeout) as outcome:
+                await asyncio.sleep(self.first_token)
+                for piece in pieces:
+                    outcome["status"] = 200
+                    yield piece
+                    await asyncio.sleep(step)
+        except DeadlineExceeded:
+            return
+
+
+PROVIDERS = {
+    "gemini": GeminiProvider,
+    "fake": FakeProvider
+}
+
+
+def get_provider(name: str = LLM_PROVIDER) -> LLMProvider:
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM_PROVIDER: {name}")
+    return PROVIDERS[name]()
+
+
+llm_provider = get_provider()
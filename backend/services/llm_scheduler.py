@@ -0,0 +1,261 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from backend.services.llm_client import backoff_delay, LLM_MAX_RETRIES
+
+# priority classes (lower runs first)
+INTERACTIVE = 0
+BACKGROUND = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background", BATCH: "batch"}
+
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "8"))
+LLM_RATE_PER_SEC = float(os.getenv("LLM_RATE_PER_SEC", "10"))
+LLM_BURST = int(os.getenv("LLM_BURST", "20"))
+
+# at most one multiplicative decrease per window, so one burst of
+# failures does not collapse the limit to the floor
+AIMD_BACKOFF = 0.5
+AIMD_COOLDOWN = 2.0
+
+WAIT_SAMPLES = 1000
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed while it was still queued"""
+
+
+def is_overload(status_code: Optional[int]) -> bool:
+    """
+    Responses that mean "slow down": no response, 429, or 5xx
+    """
+    return status_code is None or status_code == 429 or status_code >= 500
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+
+class LLMScheduler:
+    """
+    Admission control in front of the LLM provider.
+    - Concurrency cap that adapts AIMD-style: +1/limit per success,
+      halved on 429 / 5xx / timeouts
+    - Token bucket for the provider's requests-per-second quota
+    - Priority queue: interactive before background before batch
+    - Requests still queued at their deadline are dropped, not sent
+    """
+
+    def __init__(
+        self,
+        initial: int = LLM_INITIAL_CONCURRENCY,
+        minimum: int = LLM_MIN_CONCURRENCY,
+        maximum: int = LLM_MAX_CONCURRENCY,
+        rate: float = LLM_RATE_PER_SEC,
+        burst: int = LLM_BURST
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.bucket = TokenBucket(rate, burst)
+        self.in_flight = 0
+        self._queue = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._last_decrease = 0.0
+
+        self.dispatched = 0
+        self.dropped = 0
+        self.overloads = 0
+        self._waits: Dict[int, deque] = {p: deque(maxlen=WAIT_SAMPLES) for p in PRIORITY_NAMES}
+
+    # ---------------- admission ----------------
+
+    def _pump(self):
+        self._timer = None
+        now = time.monotonic()
+
+        while self._queue and self.in_flight < int(self.limit):
+            priority, _, enqueued, deadline, future = self._queue[0]
+
+            if future.done():
+                heapq.heappop(self._queue)  # caller gave up
+                continue
+
+            if deadline is not None and now >= deadline:
+                heapq.heappop(self._queue)
+                self.dropped += 1
+                future.set_exception(DeadlineExceeded())
+                continue
+
+            if not self.bucket.try_take():
+                loop = asyncio.get_running_loop()
+                self._timer = loop.call_later(self.bucket.wait_time(), self._pump)
+                return
+
+            heapq.heappop(self._queue)
+            self.in_flight += 1
+            self.dispatched += 1
+            self._waits[priority].append(now - enqueued)
+            future.set_result(True)
+
+        # wake up again to drop the next request whose deadline passes
+        expiring = [entry[3] for entry in self._queue if entry[3] is not None]
+        if expiring:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(max(0.0, min(expiring) - now), self._pump)
+
+    def _schedule_pump(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._pump()
+
+    async def acquire(self, priority: int = INTERACTIVE, deadline: Optional[float] = None):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._queue,
+            (priority, next(self._seq), time.monotonic(), deadline, future)
+        )
+        self._schedule_pump()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release(adapt=False)
+            raise
+
+    def release(self, status_code: Optional[int] = 200, adapt: bool = True):
+        """
+        Free a slot and feed the outcome into the AIMD limit
+        """
+        self.in_flight -= 1
+
+        if adapt and is_overload(status_code):
+            self.overloads += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= AIMD_COOLDOWN:
+                self.limit = max(self.minimum, self.limit * AIMD_BACKOFF)
+                self._last_decrease = now
+        elif adapt:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+        self._schedule_pump()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = INTERACTIVE, deadline: Optional[float] = None):
+        """
+        Hold one concurrency slot; set outcome["status"] before leaving
+        """
+        await self.acquire(priority, deadline)
+        outcome = {"status": None}
+        try:
+            yield outcome
+        except (asyncio.CancelledError, GeneratorExit):
+            # the caller went away (or closed a stream early);
+            # says nothing about provider load
+            self.release(adapt=False)
+            raise
+        except BaseException:
+            self.release(None)
+            raise
+        else:
+            self.release(outcome["status"])
+
+    # ---------------- requests ----------------
+
+    async def call(
+        self,
+        send: Callable[[float], Awaitable[Optional[httpx.Response]]],
+        priority: int = INTERACTIVE,
+        timeout: float = 30,
+        retries: int = LLM_MAX_RETRIES
+    ) -> Optional[httpx.Response]:
+        """
+        Run send(remaining_seconds) under admission control.
+        Overload responses are retried with jittered backoff while the
+        deadline allows; every attempt re-enters the queue.
+        """
+        deadline = time.monotonic() + timeout
+        response = None
+
+        for attempt in range(retries + 1):
+            try:
+                async with self.slot(priority, deadline) as outcome:
+                    response = await send(max(0.1, deadline - time.monotonic()))
+                    outcome["status"] = response.status_code if response is not None else None
+            except DeadlineExceeded:
+                return response
+
+            if not is_overload(outcome["status"]) or attempt == retries:
+                return response
+
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay >= deadline:
+                return response
+            await asyncio.sleep(delay)
+
+        return response
+
+    # ---------------- metrics ----------------
+
+    def stats(self) -> dict:
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, *_, future in self._queue:
+            if not future.done():
+                queued[PRIORITY_NAMES[priority]] += 1
+
+        waits = {}
+        for priority, samples in self._waits.items():
+            ordered = sorted(samples)
+            waits[PRIORITY_NAMES[priority]] = {
+                "samples": len(ordered),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2) if ordered else 0.0,
+                "p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 2) if ordered else 0.0,
+                "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0
+            }
+
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": queued,
+            "dispatched": self.dispatched,
+            "dropped_past_deadline": self.dropped,
+            "overload_responses": self.overloads,
+            "rate_per_sec": self.bucket.rate,
+            "queue_wait": waits
+        }
+
+
+llm_scheduler = LLMScheduler()
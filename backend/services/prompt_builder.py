@@ -0,0 +1,193 @@
+import os
+import re
+from typing import List, Sequence, Set
+
+from backend.services.chunker import estimate_tokens
+
+# input-token budgets per endpoint (prompt template included)
+PROMPT_BUDGET_ANALYZE = int(os.getenv("PROMPT_BUDGET_ANALYZE", "3000"))
+PROMPT_BUDGET_ANSWER = int(os.getenv("PROMPT_BUDGET_ANSWER", "1500"))
+
+# share of the analysis budget reserved for the code itself
+CODE_SHARE = 0.7
+
+# chunks whose word shingles overlap this much count as duplicates
+DUPLICATE_JACCARD = float(os.getenv("PROMPT_DUPLICATE_JACCARD", "0.8"))
+
+FOCUS_RADIUS = 20
+
+# "file.py:12:4" → 12 (the column is consumed, not matched)
+_LINE_REF_RE = re.compile(r"(?:\bline\s*|\bln\s*|:)(\d+)(?::\d+)?", re.IGNORECASE)
+
+
+# -------------------------------------------------
+# ✂️ TRIMMING HELPERS
+# -------------------------------------------------
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """
+    Keep whole lines from the top while they fit the budget
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+
+    kept, used = [], 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+
+    return "\n".join(kept + ["… (truncated)"])
+
+
+def _shingles(text: str, size: int = 3) -> Set[tuple]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def dedup_chunks(chunks: Sequence[str], threshold: float = DUPLICATE_JACCARD) -> List[str]:
+    """
+    Drop chunks that nearly repeat a more relevant (earlier) chunk
+    """
+    kept, kept_shingles = [], []
+
+    for chunk in chunks:
+        shingles = _shingles(chunk)
+        duplicate = any(
+            len(shingles & other) / max(1, len(shingles | other)) >= threshold
+            for other in kept_shingles
+        )
+        if not duplicate:
+            kept.append(chunk)
+            kept_shingles.append(shingles)
+
+    return kept
+
+
+def pack_chunks(chunks: Sequence[str], budget: int) -> List[str]:
+    """
+    Chunks are ordered best first; the least relevant are dropped
+    until the rest fit. The best chunk is truncated rather than lost.
+    """
+    packed, used = [], 0
+
+    for chunk in dedup_chunks(chunks):
+        cost = estimate_tokens(chunk) + 1
+        if used + cost > budget:
+            if not packed:
+                packed.append(truncate_to_tokens(chunk, budget))
+            break
+        packed.append(chunk)
+        used += cost
+
+    return packed
+
+
+def diagnostic_lines(diagnostics: str) -> List[int]:
+    """
+    1-based line numbers mentioned in diagnostics ("line 12", "Ln 12", "file.py:12:4")
+    """
+    return sorted({int(n) for n in _LINE_REF_RE.findall(diagnostics or "") if int(n) > 0})
+
+
+def focus_code(code: str, diagnostics: str, budget: int) -> str:
+    """
+    Fit code into the budget. Windows around the lines named in the
+    diagnostics are kept (widened while they fit); without line
+    references the head and tail of the file are kept.
+    """
+    if estimate_tokens(code) <= budget:
+        return code
+
+    lines = code.splitlines()
+    targets = [n - 1 for n in diagnostic_lines(diagnostics) if n <= len(lines)]
+
+    if not targets:
+        targets = [0, len(lines) - 1]
+
+    def render(radius: int) -> str:
+        keep = set()
+        for target in targets:
+            keep.update(range(max(0, target - radius), min(len(lines), target + radius + 1)))
+
+        out, skipped = [], 0
+        for number, line in enumerate(lines):
+            if number in keep:
+                if skipped:
+                    out.append(f"… {skipped} lines omitted …")
+                    skipped = 0
+                out.append(line)
+            else:
+                skipped += 1
+        if skipped:
+            out.append(f"… {skipped} lines omitted …")
+
+        return "\n".join(out)
+
+    best = truncate_to_tokens(render(0), budget)
+
+    # widen while the result still fits
+    for radius in (2, 5, 10, FOCUS_RADIUS, FOCUS_RADIUS * 2, FOCUS_RADIUS * 4):
+        candidate = render(radius)
+        if estimate_tokens(candidate) > budget:
+            break
+        best = candidate
+
+    return best
+
+
+# -------------------------------------------------
+# 🧱 PROMPTS
+# -------------------------------------------------
+def _log(endpoint: str, raw_tokens: int, prompt: str):
+    tokens = estimate_tokens(prompt)
+    saved = f", trimmed {raw_tokens - tokens}" if raw_tokens > tokens else ""
+    print(f"🧮 prompt[{endpoint}] ~{tokens} tokens{saved}")
+
+
+def build_analysis_prompt(
+    template: str,
+    language: str,
+    code: str,
+    combined_context: str,
+    budget: int = PROMPT_BUDGET_ANALYZE
+) -> str:
+
+    raw = template.format(language=language, code=code, combined_context=combined_context)
+    available = max(0, budget - estimate_tokens(template))
+
+    code_budget = int(available * CODE_SHARE)
+    focused = focus_code(code, combined_context, code_budget)
+
+    # context gets whatever the code did not use
+    context_budget = available - estimate_tokens(focused)
+    context = truncate_to_tokens(combined_context, context_budget)
+
+    prompt = template.format(language=language, code=focused, combined_context=context)
+    _log("analyze", estimate_tokens(raw), prompt)
+
+    return prompt
+
+
+def build_answer_prompt(
+    template: str,
+    question: str,
+    context,
+    budget: int = PROMPT_BUDGET_ANSWER
+) -> str:
+    """
+    context is either retrieved chunks (best first) or one string
+    """
+    chunks = [context] if isinstance(context, str) else list(context)
+    raw = template.format(question=question, context="\n\n".join(chunks))
+
+    available = max(0, budget - estimate_tokens(template) - estimate_tokens(question))
+    packed = pack_chunks(chunks, available)
+
+    prompt = template.format(question=question, context="\n\n".join(packed))
+    _log("answer", estimate_tokens(raw), prompt)
+
+    return prompt
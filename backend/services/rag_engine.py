@@ -1,20 +1,43 @@
-from backend.services.retrieval import retrieve_context
-from backend.services.llm_engine import generate_answer
+import os
+from typing import AsyncIterator, List, Optional
+from backend.services.retrieval import retrieve_chunks
+from backend.services.llm_engine import generate_answer, stream_answer
 
+# candidates fetched; the prompt builder dedups and trims them to budget
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
 
-async def rag_answer(question: str) -> str:
+
+async def rag_answer(question: str, skills: Optional[List[str]] = None) -> str:
     """
     Full RAG pipeline
     """
 
-    context = await retrieve_context(question)
+    context = await retrieve_chunks(question, top_k=RAG_TOP_K, skills=skills)
 
     if not context:
         return "No relevant knowledge found."
 
-    answer = generate_answer(
+    answer = await generate_answer(
         question=question,
         context=context
     )
 
     return answer
+
+
+async def stream_rag_answer(
+    question: str,
+    skills: Optional[List[str]] = None
+) -> AsyncIterator[str]:
+    """
+    Streaming RAG pipeline: answer text pieces as they are generated
+    """
+
+    context = await retrieve_chunks(question, top_k=RAG_TOP_K, skills=skills)
+
+    if not context:
+        yield "No relevant knowledge found."
+        return
+
+    async for piece in stream_answer(question=question, context=context):
+        yield piece
@@ -1,30 +1,211 @@
-import numpy as np
+import os
+from typing import Iterable, List, Optional
+
+from bson import ObjectId
 from backend.database import knowledge_collection
-from backend.services.embeddings import embed_text
+from backend.services.embeddings import aembed_text
+from backend.services.vector_index import (
+    Hit,
+    PartitionedIndex,
+    merge_hits,
+    partition_key
+)
+from backend.services.ann_index import open_ivf, ANN_INDEX_DIR
+from backend.services.lexical_index import BM25Index, open_segment, reciprocal_rank_fusion
+from backend.services.tracing import span, traced
+
+LOAD_BATCH_SIZE = 1000
+
+# "vector"        cosine only
+# "hybrid"        cosine top-N and BM25 top-N fused with reciprocal rank fusion
+# "lexical_first" BM25 picks candidates, only those are cosine-scored, then fused
+RAG_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid")
+RAG_FUSION_DEPTH = int(os.getenv("RAG_FUSION_DEPTH", "50"))
+RAG_LEXICAL_CANDIDATES = int(os.getenv("RAG_LEXICAL_CANDIDATES", "200"))
+
+# below this many chunks a skill filter is dropped in favour of the global index
+RAG_MIN_PARTITION_SIZE = int(os.getenv("RAG_MIN_PARTITION_SIZE", "20"))
+
+# process-wide index (one partition per skill), filled at startup and on
+# every ingest. With an ANN snapshot on disk it only holds newer chunks.
+knowledge_index = PartitionedIndex()
+lexical_index = BM25Index()
+ann_snapshot = None
+
+
+def index_documents(docs) -> int:
+    """
+    Add freshly stored chunks to the vector and lexical indexes
+    """
+    docs = list(docs)
+    added = knowledge_index.add(docs)
+
+    if RAG_RETRIEVAL_MODE != "vector":
+        lexical_index.add(docs)
+
+    return added
+
+
+async def load_knowledge_index() -> int:
+    """
+    Open the mmap'd ANN snapshot (if built) and its BM25 postings, and
+    stream every chunk it does not cover into the in-memory indexes
+    """
+    global ann_snapshot
+
+    ann_snapshot = open_ivf()
+
+    if ann_snapshot is not None and RAG_RETRIEVAL_MODE != "vector":
+        lexical_index.base = open_segment(ANN_INDEX_DIR)
+
+        if lexical_index.base is None:
+            # snapshot built before postings were saved with it
+            print("⚠️ ANN snapshot has no BM25 postings; rebuild it to skip this step")
+            lexical_index.add(ann_snapshot.documents())
+
+    query = {}
+    if ann_snapshot is not None and ann_snapshot.last_id:
+        query = {"_id": {"$gt": ObjectId(ann_snapshot.last_id)}}
+
+    cursor = knowledge_collection.find(
+        query,
+        {
+            "content": 1,
+            "skill": 1,
+            "embedding": 1,
+            "embedding_format": 1,
+            "embedding_scale": 1
+        }
+    ).batch_size(LOAD_BATCH_SIZE)
+
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= LOAD_BATCH_SIZE:
+            index_documents(batch)
+            batch = []
+
+    index_documents(batch)
+
+    return len(knowledge_index) + (len(ann_snapshot) if ann_snapshot else 0)
+
+
+def resolve_partitions(skills: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """
+    Map requested skills to partition keys, or None (global search)
+    when they are missing or hold too few chunks
+    """
+    if not skills:
+        return None
+
+    keys = sorted({partition_key(s) for s in skills if s})
+
+    size = knowledge_index.partition_size(keys)
+    if ann_snapshot is not None:
+        size += ann_snapshot.partition_size(keys)
+
+    return keys if size >= RAG_MIN_PARTITION_SIZE else None
+
+
+def _vector_search(query_vec, top_k: int, partitions) -> List[Hit]:
+    """
+    Merge ANN snapshot hits with the in-memory index, best first
+    """
+    hit_lists = [knowledge_index.search(query_vec, top_k, partitions)]
+
+    if ann_snapshot is not None:
+        hit_lists.append(
+            ann_snapshot.search(query_vec, top_k, skills=partitions)
+        )
+
+    return merge_hits(hit_lists, top_k)
+
+
+def _score_ids(query_vec, doc_ids: List[str]) -> List[Hit]:
+    hits = knowledge_index.score_ids(query_vec, doc_ids)
 
+    if ann_snapshot is not None:
+        hits += ann_snapshot.score_ids(query_vec, doc_ids)
 
-def cosine_similarity(a, b):
-    a = np.array(a)
-    b = np.array(b)
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+    hits.sort(key=lambda h: h.score, reverse=True)
+    return hits
 
 
-async def retrieve_context(query: str, top_k: int = 3) -> str:
+def search_knowledge(
+    query_vec,
+    top_k: int = 3,
+    skills: Optional[Iterable[str]] = None,
+    query_text: Optional[str] = None
+) -> List[Hit]:
     """
-    Semantic search using cosine similarity
+    Top-k chunks for a query. With query_text (and a non-vector mode)
+    BM25 results are fused in, so exact identifiers are not missed.
     """
+    partitions = resolve_partitions(skills)
+
+    if RAG_RETRIEVAL_MODE == "vector" or not query_text:
+        return _vector_search(query_vec, top_k, partitions)
+
+    lexical_first = RAG_RETRIEVAL_MODE == "lexical_first"
+    lexical = lexical_index.search(
+        query_text,
+        RAG_LEXICAL_CANDIDATES if lexical_first else RAG_FUSION_DEPTH,
+        partitions
+    )
+    lexical_ids = [doc_id for _, doc_id in lexical]
+
+    if lexical_first and lexical_ids:
+        vector_hits = _score_ids(query_vec, lexical_ids)
+    else:
+        vector_hits = _vector_search(
+            query_vec, max(top_k, RAG_FUSION_DEPTH), partitions
+        )
+
+    by_id = {hit.doc_id: hit for hit in vector_hits}
+
+    fused = reciprocal_rank_fusion([
+        [hit.doc_id for hit in vector_hits],
+        lexical_ids
+    ])[:top_k]
+
+    # lexical-only winners still need their content
+    missing = [doc_id for _, doc_id in fused if doc_id not in by_id]
+    if missing:
+        by_id.update((hit.doc_id, hit) for hit in _score_ids(query_vec, missing))
+
+    return [
+        Hit(score, doc_id, by_id[doc_id].content)
+        for score, doc_id in fused
+        if doc_id in by_id
+    ]
+
+
+@traced("retrieval")
+async def retrieve_chunks(
+    query: str,
+    top_k: int = 3,
+    skills: Optional[Iterable[str]] = None
+) -> List[str]:
+    """
+    Hybrid search: cosine similarity fused with BM25.
+    skills narrows the search to those skill partitions.
+    Chunks are returned best first.
+    """
+
+    query_vec = await aembed_text(query)
 
-    query_vec = embed_text(query)
+    with span("retrieval.search"):
+        hits = search_knowledge(query_vec, top_k, skills, query_text=query)
 
-    docs = await knowledge_collection.find().to_list(length=1000)
+    return [hit.content for hit in hits]
 
-    scored = []
-    for doc in docs:
-        score = cosine_similarity(query_vec, doc["embedding"])
-        scored.append((score, doc["content"]))
 
-    scored.sort(key=lambda x: x[0], reverse=True)
+async def retrieve_context(
+    query: str,
+    top_k: int = 3,
+    skills: Optional[Iterable[str]] = None
+) -> str:
 
-    top_chunks = [text for _, text in scored[:top_k]]
+    top_chunks = await retrieve_chunks(query, top_k, skills)
 
     return "\n\n".join(top_chunks)
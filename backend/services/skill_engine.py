@@ -1,44 +1,48 @@
-import json
-import re
-from backend.services.llm_engine import analyze_code_with_llm
-
-
-def extract_json(text: str):
-    try:
-        return json.loads(text)
-    except:
-        match = re.search(r"\{[\s\S]*\}", text)
-        if match:
-            try:
-                return json.loads(match.group())
-            except:
-                pass
-
-    return {
-        "has_error": False,
-        "confidence_score": 50,
-        "simple_explanation": "AI temporarily unavailable.",
-        "corrected_code": "",
-        "next_steps": []
-    }
-
-
-def analyze_skill(language: str, code: str, combined_context: str = ""):
+from backend.models import CodeAnalysis
+from backend.services.llm_engine import analyze_code_with_llm, stream_code_analysis
+from backend.services.llm_scheduler import INTERACTIVE
+from backend.services.tracing import traced
+
+
+@traced("analyze_skill")
+async def analyze_skill(
+    language: str,
+    code: str,
+    combined_context: str = "",
+    priority: int = INTERACTIVE
+):
     print(">>> analyze_skill CALLED")
 
-    llm_response = analyze_code_with_llm(
+    analysis = await analyze_code_with_llm(
         language=language,
         code=code,
-        combined_context=combined_context
+        combined_context=combined_context,
+        priority=priority
     )
 
-    parsed = extract_json(llm_response)
+    return shape_analysis(analysis)
+
+
+async def stream_skill_analysis(language: str, code: str, combined_context: str = ""):
+    """
+    ("delta", explanation text)… then ("result", analysis dict)
+    """
+    async for kind, payload in stream_code_analysis(
+        language=language,
+        code=code,
+        combined_context=combined_context
+    ):
+        if kind == "result":
+            yield kind, shape_analysis(payload)
+        else:
+            yield kind, payload
+
+
+def shape_analysis(analysis: CodeAnalysis) -> dict:
+    result = analysis.model_dump()
+
+    # corrected code only makes sense when something was wrong
+    if not analysis.has_error:
+        result["corrected_code"] = ""
 
-    return {
-        "has_error": bool(parsed.get("has_error", False)),
-        "confidence_score": int(parsed.get("confidence_score", 50)),
-        "simple_explanation": str(parsed.get("simple_explanation", "")),
-        "corrected_code": str(parsed.get("corrected_code", "")) if parsed.get("has_error") else "",
-        "next_steps": parsed.get("next_steps", [])
-        if isinstance(parsed.get("next_steps"), list) else []
-    }
+    return result
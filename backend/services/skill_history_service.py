@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from backend.database import skill_history_collection
+from backend.services.skill_summary import generate_skill_report
+from backend.services.tracing import span, traced
+
+
+@traced("history.record_daily_score")
+async def record_daily_score(user_id: str):
+    """
+    Upsert today's overall score into the dashboard history
+    """
+
+    # 1️⃣ Get updated overall score
+    with span("mongo.skill_report"):
+        report = await generate_skill_report(user_id)
+    overall_score = float(report.get("overall_score", 50))
+
+    now = datetime.utcnow()
+
+    # 🔧 FIX: use datetime instead of date
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # 2️⃣ Check if today's record exists
+    existing = await skill_history_collection.find_one({
+        "user_id": user_id,
+        "date": today
+    })
+
+    if existing:
+        # Update today's score
+        await skill_history_collection.update_one(
+            {"_id": existing["_id"]},
+            {
+                "$set": {
+                    "confidence_score": overall_score,
+                    "updated_at": now
+                }
+            }
+        )
+    else:
+        # Insert new daily record
+        await skill_history_collection.insert_one({
+            "user_id": user_id,
+            "confidence_score": overall_score,
+            "date": today,
+            "created_at": now
+        })
+
+
+async def skill_history_series(
+    user_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = "day"
+) -> List[dict]:
+    """
+    Average daily score per day / week / month in [start, end), grouped
+    by Mongo on the (user_id, date) index; one point per bucket
+    """
+
+    match = {"user_id": user_id}
+    if start or end:
+        match["date"] = {}
+        if start:
+            match["date"]["$gte"] = start
+        if end:
+            match["date"]["$lt"] = end
+
+    bucket = {"date": "$date", "unit": granularity}
+    if granularity == "week":
+        bucket["startOfWeek"] = "monday"
+
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"$dateTrunc": bucket},
+            "confidence_score": {"$avg": "$confidence_score"}
+        }},
+        {"$sort": {"_id": 1}},
+        {"$project": {
+            "_id": 0,
+            "created_at": "$_id",
+            "confidence_score": {"$round": ["$confidence_score", 2]}
+        }}
+    ]
+
+    return await skill_history_collection.aggregate(pipeline).to_list(None)
+
+
+def history_range(start, end) -> tuple:
+    """
+    Inclusive calendar dates → [start, end) datetimes
+    """
+    return (
+        datetime.combine(start, datetime.min.time()) if start else None,
+        datetime.combine(end, datetime.min.time()) + timedelta(days=1) if end else None
+    )
+
@@ -1,5 +1,15 @@
 import re
 
+# language aliases → canonical skill name
+NORMALIZE = {
+    "py": "python",
+    "js": "javascript",
+    "mongo": "mongodb"
+}
+
+def normalize(skill: str) -> str:
+    return NORMALIZE.get(skill.lower(), skill.lower())
+
 CANONICAL_SKILLS = {
     "syntax": ["syntax", "indentation", "compile", "error"],
     "loops": ["loop", "iteration", "for", "while"],
@@ -1,7 +1,10 @@
 from datetime import datetime
 from typing import List, Dict
 
+from pymongo import UpdateOne
+
 from backend.database import user_skill_state_collection
+from backend.services.tracing import traced
 
 
 async def upsert_skill_state(
@@ -32,6 +35,40 @@ async def upsert_skill_state(
     )
 
 
+@traced("mongo.skill_state_bulk_write")
+async def bulk_upsert_skill_states(user_id: str, states: List[Dict]) -> int:
+    """
+    Upsert many {skill, estimated_level, confidence_score} states for
+    one user in a single unordered bulk_write
+    """
+    if not states:
+        return 0
+
+    now = datetime.utcnow()
+
+    operations = [
+        UpdateOne(
+            {"user_id": user_id, "skill": state["skill"]},
+            {
+                "$set": {
+                    "current_level": state["estimated_level"],
+                    "confidence_score": state["confidence_score"],
+                    "last_evaluated": now
+                },
+                "$setOnInsert": {
+                    "target_level": 5
+                }
+            },
+            upsert=True
+        )
+        for state in states
+    ]
+
+    result = await user_skill_state_collection.bulk_write(operations, ordered=False)
+
+    return result.upserted_count + result.modified_count
+
+
 async def get_user_skill_states(user_id: str) -> List[Dict]:
     """
     Fetch all skill states for a user
@@ -1,17 +1,16 @@
-from collections import defaultdict
-from backend.database import events_collection
+from datetime import datetime
 
+from backend.database import user_skill_aggregates_collection
 
-def calculate_confidence(events):
 
-    total = len(events)
+def confidence_from_counts(total: int, successes: int, difficulty_sum: float) -> float:
+
     if total == 0:
         return 50.0
 
-    successes = sum(1 for e in events if not e.get("gap"))
     accuracy = successes / total
 
-    avg_difficulty = sum(e.get("difficulty", 1) for e in events) / total
+    avg_difficulty = difficulty_sum / total
     difficulty_factor = min(1, avg_difficulty / 5)
 
     score = (0.7 * accuracy) + (0.3 * difficulty_factor)
@@ -19,29 +18,63 @@ def calculate_confidence(events):
     return round(score * 100, 2)
 
 
-async def generate_skill_report(user_id: str):
+def calculate_confidence(events):
 
-    events = await events_collection.find(
-        {"user_id": user_id}
-    ).sort("created_at", 1).to_list(1000)
+    return confidence_from_counts(
+        len(events),
+        sum(1 for e in events if not e.get("gap")),
+        sum(e.get("difficulty", 1) for e in events)
+    )
 
-    skills_data = defaultdict(list)
 
-    for e in events:
-        skill = e.get("language") or e.get("skill")
-        if skill:
-            skills_data[skill.lower()].append(e)
+def event_skill(event: dict):
+    skill = event.get("language") or event.get("skill")
+    return skill.lower() if skill else None
 
-    report = []
 
-    for skill, skill_events in skills_data.items():
+async def record_event_aggregate(event: dict):
+    """
+    Fold one stored event into its (user, skill) counters
+    """
 
-        confidence_score = calculate_confidence(skill_events)
+    skill = event_skill(event)
+    if not skill:
+        return
 
-        report.append({
-            "skill": skill,
-            "confidence_score": confidence_score
-        })
+    await user_skill_aggregates_collection.update_one(
+        {"user_id": event["user_id"], "skill": skill},
+        {
+            "$inc": {
+                "total": 1,
+                "successes": 0 if event.get("gap") else 1,
+                "difficulty_sum": event.get("difficulty", 1)
+            },
+            "$set": {"updated_at": datetime.utcnow()}
+        },
+        upsert=True
+    )
+
+
+async def generate_skill_report(user_id: str):
+    """
+    One indexed read of the user's per-skill counters, so the cost
+    follows the number of skills, not the number of events
+    """
+
+    aggregates = await user_skill_aggregates_collection.find(
+        {"user_id": user_id},
+        {"_id": 0, "skill": 1, "total": 1, "successes": 1, "difficulty_sum": 1}
+    ).sort("skill", 1).to_list(None)
+
+    report = [
+        {
+            "skill": a["skill"],
+            "confidence_score": confidence_from_counts(
+                a["total"], a["successes"], a["difficulty_sum"]
+            )
+        }
+        for a in aggregates
+    ]
 
     overall = (
         round(sum(r["confidence_score"] for r in report) / len(report), 2)
@@ -51,4 +84,4 @@ async def generate_skill_report(user_id: str):
     return {
         "overall_score": overall,
         "skills": report
-    }
\ No newline at end of file
+    }
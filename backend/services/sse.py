@@ -0,0 +1,31 @@
+import json
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"  # nginx must not buffer the stream
+}
+
+
+def sse_event(data, event: Optional[str] = None) -> str:
+    """
+    One server-sent event; data is JSON-encoded so newlines survive
+    """
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data)}\n\n"
+
+
+async def _with_done(events: AsyncIterable[str]) -> AsyncIterator[str]:
+    async for event in events:
+        yield event
+    yield sse_event({}, "done")
+
+
+def sse_response(events: AsyncIterable[str]) -> StreamingResponse:
+    return StreamingResponse(
+        _with_done(events),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
@@ -1,13 +1,5 @@
 from backend.database import skills_collection
-
-NORMALIZE = {
-    "py": "python",
-    "js": "javascript",
-    "mongo": "mongodb"
-}
-
-def normalize(skill: str) -> str:
-    return NORMALIZE.get(skill.lower(), skill.lower())
+from backend.services.skill_normalizer import NORMALIZE, normalize
 
 async def get_or_create_skill(skill_name: str):
     skill_name = normalize(skill_name)
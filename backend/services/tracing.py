@@ -0,0 +1,247 @@
+import os
+import time
+import json
+import queue
+import bisect
+import secrets
+import asyncio
+import functools
+import threading
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")  # OTLP-style JSON lines, unset = off
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+
+# histogram bucket upper bounds (ms); the last bucket is open-ended
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+
+# spans kept per request for Server-Timing
+MAX_REQUEST_SPANS = 64
+
+_NOOP = nullcontext()
+
+# (trace_id, finished spans of this request) and the open span's id
+_trace: ContextVar[Optional[tuple]] = ContextVar("trace", default=None)
+_parent: ContextVar[Optional[str]] = ContextVar("span_parent", default=None)
+
+
+# =================================================
+# 🔹 HISTOGRAMS
+# =================================================
+
+class Histogram:
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def observe(self, ms: float):
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th observation
+        """
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else self.max
+        return 0.0
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max, 2),
+            "buckets_ms": dict(zip([*map(str, BUCKETS_MS), "inf"], self.buckets))
+        }
+
+
+_histograms: Dict[str, Histogram] = {}
+_lock = threading.Lock()
+
+
+def span_stats() -> dict:
+    with _lock:
+        return {name: h.summary() for name, h in sorted(_histograms.items())}
+
+
+# =================================================
+# 🔹 EXPORT
+# =================================================
+
+_export_queue: "queue.SimpleQueue[dict]" = queue.SimpleQueue()
+_exporter: Optional[threading.Thread] = None
+
+
+def _export_loop(path: str):
+    with open(path, "a", encoding="utf-8") as f:
+        while True:
+            record = _export_queue.get()
+            f.write(json.dumps(record) + "\n")
+            if _export_queue.empty():
+                f.flush()
+
+
+def _export(name: str, trace_id: str, span_id: str, parent: Optional[str],
+            start_ns: int, end_ns: int, attributes: dict):
+    global _exporter
+    if _exporter is None:
+        _exporter = threading.Thread(
+            target=_export_loop, args=(TRACE_EXPORT_PATH,),
+            name="trace-export", daemon=True
+        )
+        _exporter.start()
+
+    # field names follow the OTLP JSON span encoding
+    _export_queue.put({
+        "traceId": trace_id,
+        "spanId": span_id,
+        "parentSpanId": parent or "",
+        "name": name,
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": [
+            {"key": key, "value": {"stringValue": str(value)}}
+            for key, value in attributes.items()
+        ]
+    })
+
+
+# =================================================
+# 🔹 SPANS
+# =================================================
+
+def _record(name: str, ms: float, span_id: str, parent: Optional[str],
+            start_ns: int, attributes: dict):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(ms)
+
+    trace = _trace.get()
+    if trace is not None and len(trace[1]) < MAX_REQUEST_SPANS:
+        trace[1].append((name, ms))
+
+    if TRACE_EXPORT_PATH:
+        _export(
+            name, trace[0] if trace else secrets.token_hex(16), span_id,
+            parent, start_ns, start_ns + int(ms * 1e6), attributes
+        )
+
+
+@contextmanager
+def _span(name: str, attributes: dict):
+    span_id = secrets.token_hex(8)
+    parent = _parent.get()
+    token = _parent.set(span_id)
+    start_ns = time.time_ns()
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        _parent.reset(token)
+        _record(name, (time.perf_counter() - start) * 1000, span_id, parent, start_ns, attributes)
+
+
+def span(name: str, **attributes):
+    """
+    with span("llm.generate", provider="gemini"): ...
+    A shared no-op when tracing is disabled.
+    """
+    if not TRACING_ENABLED:
+        return _NOOP
+    return _span(name, attributes)
+
+
+def traced(name: str):
+    """
+    Decorator form of span() for sync and async functions.
+    When tracing is disabled the function is returned unchanged.
+    """
+
+    def decorate(fn):
+        if not TRACING_ENABLED:
+            return fn
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _span(name, {}):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+# =================================================
+# 🔹 HTTP MIDDLEWARE
+# =================================================
+
+def server_timing(spans: List[tuple]) -> str:
+    return ", ".join(
+        f"{name.replace(' ', '_')};dur={ms:.1f}" for name, ms in spans
+    )
+
+
+class TracingMiddleware:
+    """
+    One trace per request, timed under its route template, plus a
+    Server-Timing header with the spans finished before the response started
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            return await self.app(scope, receive, send)
+
+        spans: List[tuple] = []
+        trace_token = _trace.set((secrets.token_hex(16), spans))
+        span_id = secrets.token_hex(8)
+        parent_token = _parent.set(span_id)
+        start_ns = time.time_ns()
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and SERVER_TIMING and spans:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(spans).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _parent.reset(parent_token)
+
+            # route template (/jobs/{job_id}), not the raw path
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            _record(
+                f"http {scope['method']} {route}",
+                (time.perf_counter() - start) * 1000,
+                span_id, None, start_ns, {"path": scope["path"]}
+            )
+            _trace.reset(trace_token)
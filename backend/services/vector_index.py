@@ -0,0 +1,261 @@
+import os
+import threading
+from typing import Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from backend.services.embedding_codec import decode_embedding, quantize_int8
+from backend.services.skill_normalizer import normalize
+
+EMBEDDING_DIM = 384
+
+# in-memory row storage: "float32" | "float16" | "int8" (per-row scale)
+RAG_INDEX_DTYPE = os.getenv("RAG_INDEX_DTYPE", "float32")
+SCORE_BLOCK = 8192
+
+
+class Hit(NamedTuple):
+    score: float
+    doc_id: str
+    content: str
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize rows as float32 (zero rows stay zero)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the top_k highest scores, best first
+    """
+    if top_k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if top_k < scores.size:
+        idx = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        idx = np.arange(scores.size)
+
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+class VectorIndex:
+    """
+    Process-wide brute-force index over knowledge chunks.
+    - One contiguous, pre-normalized matrix (float32, or quantized
+      float16 / int8 to cut memory 2-4x)
+    - Parallel id / content lists
+    - A query is a single mat-vec product + argpartition
+    """
+
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        capacity: int = 1024,
+        dtype: str = RAG_INDEX_DTYPE
+    ):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._vectors = np.zeros((capacity, dim), dtype=self.dtype)
+        self._scales = np.ones(capacity, dtype=np.float32)
+        self._ids: List[str] = []
+        self._contents: List[str] = []
+        self._positions = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._positions
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        capacity = self._vectors.shape[0]
+
+        if needed <= capacity:
+            return
+
+        capacity = max(needed, capacity * 2)
+
+        grown = np.zeros((capacity, self.dim), dtype=self.dtype)
+        grown[:self._size] = self._vectors[:self._size]
+        scales = np.ones(capacity, dtype=np.float32)
+        scales[:self._size] = self._scales[:self._size]
+
+        self._vectors, self._scales = grown, scales
+
+    def _store(self, start: int, vectors: np.ndarray):
+        end = start + len(vectors)
+
+        if self.dtype == np.int8:
+            for row, vector in enumerate(vectors, start):
+                self._vectors[row], self._scales[row] = quantize_int8(vector)
+        else:
+            self._vectors[start:end] = vectors
+
+    def _score(self, query: np.ndarray, size: int) -> np.ndarray:
+        if self.dtype == np.float32:
+            return self._vectors[:size] @ query
+
+        # quantized rows are widened block by block to bound temp memory
+        scores = np.empty(size, dtype=np.float32)
+        for start in range(0, size, SCORE_BLOCK):
+            end = min(start + SCORE_BLOCK, size)
+            scores[start:end] = self._vectors[start:end].astype(np.float32) @ query
+
+        if self.dtype == np.int8:
+            scores *= self._scales[:size]
+
+        return scores
+
+    def add(self, docs: Iterable[dict]) -> int:
+        """
+        Append knowledge documents ({_id, content, embedding}) in any
+        stored embedding format. Documents already indexed are skipped.
+        """
+        with self._lock:
+            fresh = [
+                d for d in docs
+                if d.get("embedding") is not None
+                and str(d["_id"]) not in self._positions
+            ]
+
+            if not fresh:
+                return 0
+
+            vectors = normalize_rows(np.vstack([decode_embedding(d) for d in fresh]))
+
+            self._reserve(len(fresh))
+            start = self._size
+            self._store(start, vectors)
+
+            for offset, doc in enumerate(fresh):
+                doc_id = str(doc["_id"])
+                self._positions[doc_id] = start + offset
+                self._ids.append(doc_id)
+                self._contents.append(doc["content"])
+
+            # publish rows only once they are fully written
+            self._size = start + len(fresh)
+
+            return len(fresh)
+
+    def search(self, query_vec, top_k: int = 3) -> List[Hit]:
+        """
+        Cosine top-k against every indexed chunk
+        """
+        size = self._size
+        if size == 0:
+            return []
+
+        query = normalize_rows(np.asarray(query_vec).reshape(1, -1))[0]
+        scores = self._score(query, size)
+
+        return [
+            Hit(float(scores[i]), self._ids[i], self._contents[i])
+            for i in top_k_indices(scores, top_k)
+        ]
+
+    def score_ids(self, query_vec, doc_ids: Iterable[str]) -> List[Hit]:
+        """
+        Cosine scores for just these chunks (ids not indexed are ignored)
+        """
+        rows = [self._positions[d] for d in doc_ids if d in self._positions]
+        if not rows:
+            return []
+
+        query = normalize_rows(np.asarray(query_vec).reshape(1, -1))[0]
+        scores = self._vectors[rows].astype(np.float32) @ query
+        if self.dtype == np.int8:
+            scores *= self._scales[rows]
+
+        return [
+            Hit(float(score), self._ids[row], self._contents[row])
+            for row, score in zip(rows, scores)
+        ]
+
+
+def partition_key(skill) -> str:
+    """
+    Canonical skill name ("py" → "python"), shared by indexing and queries
+    """
+    return normalize(str(skill or "").strip()) or "general"
+
+
+def merge_hits(hit_lists: Iterable[List[Hit]], top_k: int) -> List[Hit]:
+    merged = [hit for hits in hit_lists for hit in hits]
+    merged.sort(key=lambda h: h.score, reverse=True)
+    return merged[:top_k]
+
+
+class PartitionedIndex:
+    """
+    One VectorIndex per skill, so a filtered query only scans
+    the matrices of the requested skills
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, dtype: str = RAG_INDEX_DTYPE):
+        self.dim = dim
+        self.dtype = dtype
+        self.partitions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(p) for p in self.partitions.values())
+
+    def __contains__(self, doc_id: str) -> bool:
+        return any(doc_id in p for p in self.partitions.values())
+
+    def partition_size(self, skills: Iterable[str]) -> int:
+        return sum(
+            len(self.partitions[s]) for s in skills if s in self.partitions
+        )
+
+    def add(self, docs: Iterable[dict]) -> int:
+        grouped = {}
+        for doc in docs:
+            grouped.setdefault(partition_key(doc.get("skill")), []).append(doc)
+
+        added = 0
+        for skill, skill_docs in grouped.items():
+            with self._lock:
+                partition = self.partitions.get(skill)
+                if partition is None:
+                    partition = self.partitions[skill] = VectorIndex(
+                        self.dim, dtype=self.dtype
+                    )
+            added += partition.add(skill_docs)
+
+        return added
+
+    def search(
+        self,
+        query_vec,
+        top_k: int = 3,
+        skills: Optional[Iterable[str]] = None
+    ) -> List[Hit]:
+        """
+        Top-k over the given skill partitions (all when skills is None)
+        """
+        if skills is None:
+            targets = list(self.partitions.values())
+        else:
+            targets = [self.partitions[s] for s in skills if s in self.partitions]
+
+        return merge_hits((p.search(query_vec, top_k) for p in targets), top_k)
+
+    def score_ids(self, query_vec, doc_ids: Iterable[str]) -> List[Hit]:
+        doc_ids = list(doc_ids)
+        return [
+            hit
+            for partition in self.partitions.values()
+            for hit in partition.score_ids(query_vec, doc_ids)
+        ]
@@ -24,12 +24,23 @@ print("✅ .env loaded successfully")
 # -------------------------------------------------
 from backend.database import init_db
 from backend.routes import router
+from backend.services.retrieval import load_knowledge_index
+from backend.services.llm_client import close_client
+from backend.services.llm_providers import llm_provider
+from backend.services.tracing import TracingMiddleware
+from backend.services.analysis_jobs import job_workers
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    chunks = await load_knowledge_index()
+    print(f"✅ Knowledge index loaded ({chunks} chunks)")
+    print(f"🤖 LLM provider: {llm_provider.name} ({llm_provider.model})")
+    job_workers.start()
     yield
+    await job_workers.stop()
+    await close_client()
 
 
 app = FastAPI(
@@ -38,6 +49,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# ⏱️ per-request spans + Server-Timing header
+app.add_middleware(TracingMiddleware)
+
 # -------------------------------------------------
 # 🔌 BACKEND ROUTES
 # -------------------------------------------------